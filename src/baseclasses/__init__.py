@@ -48,7 +48,12 @@ from nomad.metainfo import (
 from .atmosphere import Atmosphere
 from .customreadable_identifier import ReadableIdentifiersCustom
 from .helper.add_solar_cell import add_solar_cell
-from .helper.utilities import get_processes, update_archive
+from .helper.utilities import (
+    get_processes,
+    get_processes_of_samples,
+    update_archive,
+    write_process_table,
+)
 from .product_info import ProductInfo
 
 
@@ -106,17 +111,18 @@ class Batch(Collection):
                     if sample.reference is not None
                     else self.lab_id
                 )
-                sample_entry_id = sample.reference.m_parent.entry_id
-                samples.append(
-                    [sample_id]
-                    + [p[1] for p in get_processes(archive, sample_entry_id)]
-                )
-            import pandas as pd
-
-            df = pd.DataFrame(samples)
+                samples.append((sample_id, sample.reference.m_parent.entry_id))
+            processes = get_processes_of_samples(
+                archive, [entry_id for _, entry_id in samples]
+            )
+            rows = (
+                (sample_id, [p[1] for p in processes[entry_id]])
+                for sample_id, entry_id in samples
+            )
+            width = 1 + max(len(p) for p in processes.values())
             export_file_name = f'list_of_ids_{self.name}.csv'
             with archive.m_context.raw_file(export_file_name, 'w') as outfile:
-                df.to_csv(outfile.name)
+                write_process_table(outfile, rows, width)
             self.csv_export_file = export_file_name
             # except BaseException:
             #     pass
@@ -30,50 +30,32 @@ from nomad_material_processing.combinatorial import (
 )
 
 from .. import LibrarySample
+from ..helper.entry_projection import get_path, iter_projected
 
 
-def collectSampleData(archive):
+def collectSampleData(archive, logger=None):
     # This function gets all archives whcih reference this archive.
     # Iterates over them and selects relevant data for the
     # result section of the solarcellsample
     # At the end the synthesis steps are ordered
     # returns a dictionary containing synthesis process, JV and EQE information
 
-    from nomad import files
-    from nomad.app.v1.models import MetadataPagination
-    from nomad.search import search
-
     # search for all archives referencing this archive
     query = {
         'entry_references.target_entry_id': archive.metadata.entry_id,
         'section_defs.definition_qualified_name:any': ['baseclasses.BaseProcess'],
     }
-    pagination = MetadataPagination()
-    pagination.page_size = 100
-    search_result = search(
-        owner='all',
-        query=query,
-        pagination=pagination,
-        user_id=archive.metadata.main_author.user_id,
+    search_result = iter_projected(
+        archive,
+        query,
+        ['results.material.elements'],
+        logger=logger,
     )
     entry = {}
-    for res in search_result.data:
-        try:
-            # Open Archives
-            with files.UploadFiles.get(upload_id=res['upload_id']).read_archive(
-                entry_id=res['entry_id']
-            ) as arch:
-                entry_id = res['entry_id']
-                entry.update({entry_id: {}})
-                try:
-                    entry[entry_id]['elements'] = arch[entry_id]['results']['material'][
-                        'elements'
-                    ]
-                except BaseException:
-                    entry[entry_id]['elements'] = []
-
-        except Exception as e:
-            print('Error in processing data: ', e)
+    for res in search_result:
+        entry[res['entry_id']] = {
+            'elements': get_path(res, 'results.material.elements', [])
+        }
 
     return entry
 
@@ -235,7 +217,7 @@ class CatalysisSample(CombinatorialLibrary):
             archive.results.material = Material()
         archive.results.material.elements = []
 
-        result_data = collectSampleData(archive)
+        result_data = collectSampleData(archive, logger)
         for _, process in result_data.items():
             if not process['elements']:
                 continue
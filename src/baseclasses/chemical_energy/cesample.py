@@ -31,6 +31,10 @@ from nomad.metainfo import Datetime, Quantity, Reference, Section, SubSection
 from baseclasses import PubChemPureSubstanceSectionCustom
 
 from .. import ReadableIdentifiersCustom
+from ..helper.project_sample_numbers import (
+    claim_project_sample_number,
+    reserve_project_sample_number,
+)
 from ..helper.utilities import log_error
 
 
@@ -80,7 +84,6 @@ class SampleIDCE(ReadableIdentifiersCustom):
 
     def normalize(self, archive, logger):
         super().normalize(archive, logger)
-        from nomad.app.v1.models import MetadataPagination
 
         if self.institute and self.short_name and self.owner:
             from unidecode import unidecode
@@ -94,33 +97,11 @@ class SampleIDCE(ReadableIdentifiersCustom):
             sample_id_list = [self.institute, self.short_name, owner]
             self.lab_id = '_'.join(sample_id_list)
 
-        from nomad.search import search
-
-        if self.project_sample_number is not None:
-            sample_id_tmp = f'{self.lab_id}_{self.project_sample_number:04d}'
-        else:
-            sample_id_tmp = f'{self.lab_id}_9999'
-        query = {'results.eln.lab_ids': sample_id_tmp}
-        search_result_1 = search(
-            owner='all', query=query, user_id=archive.metadata.main_author.user_id
-        )
-
-        if self.project_sample_number is None or (
-            len(search_result_1.data) != 0
-            and archive.metadata.entry_id
-            not in [d['entry_id'] for d in search_result_1.data]
+        if self.project_sample_number is None or not claim_project_sample_number(
+            archive, self.lab_id, self.project_sample_number
         ):
-            query = {'results.eln.lab_ids': self.lab_id}
-            pagination = MetadataPagination()
-            pagination.page_size = 9999
-            search_result = search(
-                owner='all',
-                query=query,
-                pagination=pagination,
-                user_id=archive.metadata.main_author.user_id,
-            )
-            self.project_sample_number = get_next_project_sample_number(
-                search_result.data, archive.metadata.entry_id
+            self.project_sample_number = reserve_project_sample_number(
+                archive, self.lab_id
             )
 
         if self.lab_id is not None and self.project_sample_number is not None:
@@ -147,26 +128,11 @@ def build_initial_id(institute, owner, datetime=None):
 
 
 def create_id(archive, lab_id_base):
-    from nomad.app.v1.models import MetadataPagination
-    from nomad.search import search
-
-    query = {'results.eln.lab_ids': lab_id_base}
-    pagination = MetadataPagination()
-    pagination.page_size = 9999
-    search_result = search(
-        owner='all',
-        query=query,
-        pagination=pagination,
-        user_id=archive.metadata.main_author.user_id,
-    )
-    project_sample_number = get_next_project_sample_number(
-        search_result.data, archive.metadata.entry_id
-    )
-
-    if lab_id_base is not None and project_sample_number is not None:
-        lab_id = f'{lab_id_base}_{project_sample_number:04d}'
-        if not archive.data.lab_id:
-            archive.data.lab_id = lab_id
+    # a reserved number is used up, so only reserve one if it is needed
+    if lab_id_base is None or archive.data.lab_id:
+        return
+    project_sample_number = reserve_project_sample_number(archive, lab_id_base)
+    archive.data.lab_id = f'{lab_id_base}_{project_sample_number:04d}'
 
 
 class SampleIDCE2(ReadableIdentifiersCustom):
@@ -17,6 +17,7 @@
 #
 
 import numpy as np
+from nomad.datamodel.data import ArchiveSection
 from nomad.metainfo import Quantity, Section, SubSection
 
 from .potentiostat_measurement import PotentiostatProperties
@@ -84,6 +85,36 @@ class CPProperties(PotentiostatProperties):
     )
 
 
+def summarize_cp(time, voltage, step_1_current, sample_area):
+    """
+    Returns the scalars of a chronopotentiometry run the CP analysis uses,
+    all values are magnitudes in the units of CPSummary.
+
+    Args:
+        time: times in s
+        voltage: voltages in V
+        step_1_current: current in A or None
+        sample_area: area in cm^2 or None
+    """
+    voltage = np.asarray(voltage, dtype=np.float64)
+    current_density = None
+    if step_1_current is not None and sample_area is not None:
+        current_density = step_1_current / sample_area
+    return dict(
+        duration=time[-1] if len(time) else None,
+        voltage_avg_first5=np.mean(voltage[:5]) if len(voltage) else None,
+        voltage_avg_last5=np.mean(voltage[-5:]) if len(voltage) else None,
+        current_density=current_density,
+    )
+
+
+class CPSummary(ArchiveSection):
+    duration = Quantity(type=np.dtype(np.float64), unit=('s'))
+    voltage_avg_first5 = Quantity(type=np.dtype(np.float64), unit=('V'))
+    voltage_avg_last5 = Quantity(type=np.dtype(np.float64), unit=('V'))
+    current_density = Quantity(type=np.dtype(np.float64), unit=('A/cm^2'))
+
+
 class Chronopotentiometry(Voltammetry):
     m_def = Section(
         links=['https://w3id.org/nfdi4cat/voc4cat_0007208'],
@@ -92,10 +123,30 @@ class Chronopotentiometry(Voltammetry):
 
     properties = SubSection(section_def=CPProperties)
 
+    summary = SubSection(
+        section_def=CPSummary,
+        description='Scalars of the run used by the CP analysis, so it does not '
+        'have to load the time and voltage arrays.',
+    )
+
     def normalize(self, archive, logger):
         if self.method is None:
             self.method = 'Chronopotentiometry'
         super().normalize(archive, logger)
+        if self.time is not None and self.voltage is not None:
+            properties = self.properties
+            self.summary = CPSummary(
+                **summarize_cp(
+                    self.time.to('s').magnitude,
+                    self.voltage.to('V').magnitude,
+                    properties.step_1_current.to('A').magnitude
+                    if properties is not None and properties.step_1_current is not None
+                    else None,
+                    properties.sample_area.to('cm^2').magnitude
+                    if properties is not None and properties.sample_area is not None
+                    else None,
+                )
+            )
 
 
 class ConstProperties(PotentiostatProperties):
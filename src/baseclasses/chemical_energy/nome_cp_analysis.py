@@ -30,8 +30,14 @@ from nomad.metainfo import Quantity, Reference, Section, SubSection
 
 from baseclasses.chemical_energy import Chronopotentiometry
 
+from ..helper.entry_projection import (
+    get_path,
+    iter_projected,
+    read_archives,
+)
 from ..helper.utilities import get_reference
 from .cesample import export_lab_id
+from .chronopotentiometry import summarize_cp
 
 
 class CPOERReference(SectionReference):
@@ -120,13 +126,13 @@ class CPAnalysis(Analysis):
             current_density = current / area
         return current_density
 
-    def group_by_current_density(self, inputs):
+    def group_by_current_density(self, inputs, summaries):
         grouped_inputs = []
         recent_group = None
-        for input_ref in inputs:
-            input_obj = input_ref.reference
-            current_density = round(self.get_current_density(input_obj.properties), 4)
-            duration = input_obj.time[-1]
+        for input_ref, summary in zip(inputs, summaries):
+            current_density = summary['current_density']
+            if current_density is not None:
+                current_density = round(current_density, 4)
 
             # start a new group if the current density changes
             # group together if same current density is immediately following each other
@@ -137,40 +143,43 @@ class CPAnalysis(Analysis):
                 recent_group = {
                     'current_density': current_density,
                     'references': [],
+                    'summaries': [],
                     'experiment_duration': 0,
                 }
                 grouped_inputs.append(recent_group)
             # add current object to group
             recent_group['references'].append(input_ref)
-            recent_group['experiment_duration'] += duration
+            recent_group['summaries'].append(summary)
+            recent_group['experiment_duration'] += summary['duration']
         return grouped_inputs
 
-    def get_oer_analysis_result(self, input_refs, experiment_duration):
-        first_oer_run = input_refs[0].reference
-        last_oer_run = input_refs[-1].reference
-        voltage_avg_first5 = np.mean(np.array(first_oer_run.voltage[:5]))
-        voltage_avg_last5 = np.mean(np.array(last_oer_run.voltage[-5:]))
+    def get_oer_analysis_result(self, input_refs, summaries, experiment_duration):
+        first_oer_run = summaries[0]
+        last_oer_run = summaries[-1]
+        voltage_avg_first5 = first_oer_run['voltage_avg_first5']
+        voltage_avg_last5 = last_oer_run['voltage_avg_last5']
         voltage_difference = voltage_avg_first5 - voltage_avg_last5
 
-        current_density = self.get_current_density(first_oer_run.properties)
-
         return CPOERAnalysisResult(
-            name=first_oer_run.name,
+            name=first_oer_run['name'],
             voltage_avg_first5=voltage_avg_first5,
             voltage_avg_last5=voltage_avg_last5,
             voltage_difference=voltage_difference,
-            j=current_density,
+            j=first_oer_run['current_density'],
             experiment_duration=experiment_duration,
-            reaction_type=first_oer_run.method,
-            samples=first_oer_run.samples,
-            voltage_shift=first_oer_run.voltage_shift,
-            resistance=first_oer_run.resistance,
+            reaction_type=first_oer_run['method'],
+            samples=input_refs[0].reference.samples,
+            voltage_shift=first_oer_run['voltage_shift'],
+            resistance=first_oer_run['resistance'],
             inputs=input_refs,
         )
 
     def normalize(self, archive, logger):
-        refs = get_all_cp_in_upload(archive, archive.metadata.upload_id)
-        self.inputs = [CPOERReference(name=name, reference=ref) for [name, ref] in refs]
+        summaries = get_cp_summaries(archive, archive.metadata.upload_id, logger=logger)
+        self.inputs = [
+            CPOERReference(name=summary['data_file'], reference=summary['reference'])
+            for summary in summaries
+        ]
 
         if self.inputs is not None and len(self.inputs) > 0:
             for sample in self.inputs[0].reference.samples:
@@ -189,11 +198,26 @@ class CPAnalysis(Analysis):
                     except Exception as e:
                         logger.warn('Could not analyse material', exc_info=e)
 
+            complete_inputs, complete_summaries = [], []
+            for input_ref, summary in zip(self.inputs, summaries):
+                if any(summary[name] is None for name in CP_SUMMARY_QUANTITIES[:3]):
+                    logger.warning(
+                        f'Could not summarize the chronopotentiometry run '
+                        f'{summary["data_file"]}, it is not analysed.'
+                    )
+                    continue
+                complete_inputs.append(input_ref)
+                complete_summaries.append(summary)
+
             output_list = []
-            grouped_inputs = self.group_by_current_density(self.inputs)
+            grouped_inputs = self.group_by_current_density(
+                complete_inputs, complete_summaries
+            )
             for group in grouped_inputs:
                 result = self.get_oer_analysis_result(
-                    group['references'], group['experiment_duration']
+                    group['references'],
+                    group['summaries'],
+                    group['experiment_duration'],
                 )
                 output_list.append(result)
 
@@ -203,32 +227,115 @@ class CPAnalysis(Analysis):
         super().normalize(archive, logger)
 
 
-def get_all_cp_in_upload(data_archive, upload_id):
-    from nomad.app.v1.models import MetadataPagination
-    from nomad.search import search
+CP_QUERY_DEFINITION = (
+    'baseclasses.chemical_energy.chronopotentiometry.Chronopotentiometry'
+)
+
+CP_SUMMARY_INCLUDE = [
+    'data.datetime',
+    'data.data_file',
+    'data.name',
+    'data.method',
+    'data.voltage_shift',
+    'data.resistance',
+    'data.summary',
+]
+
+CP_SUMMARY_QUANTITIES = (
+    'duration',
+    'voltage_avg_first5',
+    'voltage_avg_last5',
+    'current_density',
+)
+
+CP_LEGACY_INCLUDE = [
+    'data.time',
+    'data.voltage',
+    'data.properties.step_1_current',
+    'data.properties.sample_area',
+]
 
+
+def _cp_summary(hit, upload_id):
+    data = hit.get('data', {})
+    summary = dict(
+        datetime=data['datetime'],
+        data_file=data.get('data_file'),
+        reference=get_reference(upload_id, hit['entry_id']),
+        name=data.get('name'),
+        method=data.get('method'),
+        voltage_shift=data.get('voltage_shift'),
+        resistance=data.get('resistance'),
+        **dict.fromkeys(CP_SUMMARY_QUANTITIES),
+    )
+    summary.update(data.get('summary', {}))
+    return summary
+
+
+def _legacy_cp_summary(projection):
+    return summarize_cp(
+        get_path(projection, 'data.time', []),
+        get_path(projection, 'data.voltage', []),
+        get_path(projection, 'data.properties.step_1_current'),
+        get_path(projection, 'data.properties.sample_area'),
+    )
+
+
+def get_cp_summaries(data_archive, upload_id, page_size=1000, logger=None):
+    """
+    Returns the summaries of the OER and HER chronopotentiometry runs of an
+    upload sorted by their datetime.
+
+    Only the scalars of `Chronopotentiometry.summary` are fetched with the
+    search. Entries normalized before the summary existed are read from
+    their archives and summarized here.
+
+    Returns:
+        list: dicts with the `CPSummary` quantities as magnitudes, the
+            reference of the entry and the metadata of the analysis result
+    """
     query = {
-        'section_defs.definition_qualified_name': 'baseclasses.chemical_energy.chronopotentiometry.Chronopotentiometry',
-        'results.eln.methods:any': ['OER Chronopotentiometry', 'HER Chronopotentiometry',],
+        'section_defs.definition_qualified_name': CP_QUERY_DEFINITION,
+        'results.eln.methods:any': [
+            'OER Chronopotentiometry',
+            'HER Chronopotentiometry',
+        ],
         'upload_id': upload_id,
     }
-    pagination = MetadataPagination()
-    pagination.page_size = 10000
-    search_result = search(
-        owner='all',
-        query=query,
-        pagination=pagination,
-        user_id=data_archive.metadata.main_author.user_id,
-    )
-
-    lst = search_result.data
-    lst.sort(
-        key=lambda cp_entry: datetime.strptime(
-            cp_entry['data']['datetime'], '%Y-%m-%dT%H:%M:%S%z'
+    hits = list(
+        iter_projected(
+            data_archive,
+            query,
+            CP_SUMMARY_INCLUDE,
+            page_size=page_size,
+            logger=logger,
         )
     )
-    refs = [
-        [cp_entry['data']['data_file'], get_reference(upload_id, cp_entry['entry_id'])]
-        for cp_entry in lst
+    summaries = [_cp_summary(hit, upload_id) for hit in hits]
+
+    legacy = [
+        (summary, hit)
+        for summary, hit in zip(summaries, hits)
+        if get_path(hit, 'data.summary.duration') is None
+    ]
+    projections = read_archives(
+        ((upload_id, hit['entry_id'], CP_LEGACY_INCLUDE) for _, hit in legacy),
+        logger=logger,
+    )
+    for (summary, _), projection in zip(legacy, projections):
+        if projection is not None:
+            summary.update(_legacy_cp_summary(projection))
+
+    summaries.sort(
+        key=lambda summary: datetime.strptime(
+            summary['datetime'], '%Y-%m-%dT%H:%M:%S%z'
+        )
+    )
+    return summaries
+
+
+def get_all_cp_in_upload(data_archive, upload_id):
+    return [
+        [summary['data_file'], summary['reference']]
+        for summary in get_cp_summaries(data_archive, upload_id)
     ]
-    return refs
@@ -16,6 +16,11 @@
 # limitations under the License.
 #
 
+import bisect
+import math
+import threading
+import time
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
@@ -26,8 +31,15 @@ from nomad.metainfo import MProxy, Quantity, Reference, Section
 
 from baseclasses.solar_energy import UVvisData
 
+from ..helper.entry_projection import iter_projected
 from ..helper.utilities import get_reference
 
+CALIBRATION_INCLUDE = [
+    'data.material_name',
+    'data.minimum_peak_value',
+    'data.maximum_peak_value',
+]
+
 
 class UVvisDataConcentration(UVvisData, PlotSection):
     m_def = Section(a_eln=dict(overview=True))
@@ -190,83 +202,173 @@ def calculate_concentration(slope, intercept, peak_value, blank_value):
     return concentration
 
 
-def get_concentration_reference(data_archive, logger, material, peak_value):
-    # This function gets all UVvisConcentrationDetection archives.
-    # Iterates over them and selects suitable UVvisConcentrationDetection based on material and min/max peak_values.
-    # Computes the concentration of the given UVvisMeasurement based on slope and intercept of suitable UVvisConcentrationDetection.
-    # Returns a concentration.
+class CalibrationIndex:
+    """
+    UVvisConcentrationDetection calibrations by material.
+
+    The peak value ranges of each material are sorted by their start and
+    end, so the calibrations containing a peak value and the one with the
+    nearest range are found by bisection. If several calibrations fit equally
+    well, the one first in search order wins.
+    """
+
+    def __init__(self, calibrations):
+        self.calibrations = {}
+        for order, calibration in enumerate(calibrations):
+            material = calibration['material_name']
+            self.calibrations.setdefault(material, {})[order] = calibration
+        self.starts = {}
+        self.ends = {}
+        for material, entries in self.calibrations.items():
+            self.starts[material] = sorted(
+                (calibration['minimum_peak_value'], order)
+                for order, calibration in entries.items()
+            )
+            self.ends[material] = sorted(
+                (calibration['maximum_peak_value'], order)
+                for order, calibration in entries.items()
+            )
 
-    from nomad import files
-    from nomad.app.v1.models import MetadataPagination
+    def containing(self, material, peak_value):
+        """Returns the calibrations whose range contains the peak value."""
+        starts = self.starts.get(material, [])
+        candidates = starts[: bisect.bisect_right(starts, (peak_value, math.inf))]
+        calibrations = self.calibrations.get(material, {})
+        return [
+            calibrations[order]
+            for order in sorted(order for _, order in candidates)
+            if peak_value <= calibrations[order]['maximum_peak_value']
+        ]
+
+    def nearest(self, material, peak_value):
+        """
+        Returns the calibration with the range closest to the peak value out
+        of those not containing it, or None.
+        """
+        candidates = []
+        starts = self.starts.get(material, [])
+        above = bisect.bisect_right(starts, (peak_value, math.inf))
+        if above < len(starts):
+            start, order = starts[above]
+            candidates.append((start - peak_value, order))
+        ends = self.ends.get(material, [])
+        below = bisect.bisect_left(ends, (peak_value, -math.inf))
+        if below > 0:
+            end = ends[below - 1][0]
+            order = ends[bisect.bisect_left(ends, (end, -math.inf))][1]
+            candidates.append((peak_value - end, order))
+        if not candidates:
+            return None
+        return self.calibrations[material][min(candidates)[1]]
+
+
+CALIBRATION_QUERY = {
+    'section_defs.definition_qualified_name': 'baseclasses.data_transformations.uvvisconcentrationdetection.UVvisConcentrationDetection',
+}
+
+CALIBRATION_INDEX_TTL = 300
+
+_calibration_indexes = {}
+_calibration_indexes_lock = threading.Lock()
+
+
+def _calibration_state(data_archive):
+    # changes with every new or deleted calibration
+    from nomad.app.v1.models import MetadataPagination, MetadataRequired
     from nomad.search import search
 
-    # search for all UVvisConcentrationDetection archives
-    query = {
-        'section_defs.definition_qualified_name': 'baseclasses.data_transformations.uvvisconcentrationdetection.UVvisConcentrationDetection',
-    }
     pagination = MetadataPagination()
-    pagination.page_size = 100
+    pagination.page_size = 1
+    pagination.order_by = 'upload_create_time'
+    pagination.order = 'desc'
     search_result = search(
         owner='all',
-        query=query,
+        query=CALIBRATION_QUERY,
         pagination=pagination,
+        required=MetadataRequired(include=['entry_id', 'upload_create_time']),
         user_id=data_archive.metadata.main_author.user_id,
     )
+    latest = search_result.data[0] if search_result.data else {}
+    return (
+        search_result.pagination.total,
+        latest.get('entry_id'),
+        latest.get('upload_create_time'),
+    )
 
-    matching_calibrations = []
-    extrapolation_calibrations = []
 
-    for res in search_result.data:
+def _build_calibration_index(data_archive, logger):
+    calibrations = []
+    hits = iter_projected(
+        data_archive,
+        CALIBRATION_QUERY,
+        CALIBRATION_INCLUDE,
+        required=CALIBRATION_INCLUDE,
+        page_size=1000,
+        logger=logger,
+    )
+    for res in hits:
+        entry_data = res.get('data', {})
         try:
-            # Open Archives
-            with files.UploadFiles.get(upload_id=res['upload_id']).read_archive(
-                entry_id=res['entry_id']
-            ) as archive:
-                entry_id = res['entry_id']
-                entry_data = archive[entry_id]['data']
-                entry = {}
-                try:
-                    entry['entry_id'] = entry_id
-                    entry['upload_id'] = res['upload_id']
-                    entry['material_name'] = entry_data['material_name']
-                    entry['minimum_peak_value'] = entry_data['minimum_peak_value']
-                    entry['maximum_peak_value'] = entry_data['maximum_peak_value']
-                except BaseException:
-                    entry['material_name'] = None
-
-                if entry['material_name'] == material:
-                    if (
-                        entry['minimum_peak_value']
-                        <= peak_value
-                        <= entry['maximum_peak_value']
-                    ):
-                        matching_calibrations.append(entry)
-                    else:
-                        extrapolation_calibrations.append(entry)
-        except Exception as e:
-            logger.error('Error in processing data: ', e)
+            calibrations.append(
+                {
+                    'entry_id': res['entry_id'],
+                    'upload_id': res['upload_id'],
+                    'material_name': entry_data['material_name'],
+                    'minimum_peak_value': float(entry_data['minimum_peak_value']),
+                    'maximum_peak_value': float(entry_data['maximum_peak_value']),
+                }
+            )
+        except (KeyError, TypeError, ValueError):
+            # incomplete calibrations are skipped, as before the index
+            continue
+    return CalibrationIndex(calibrations)
+
+
+def get_calibration_index(data_archive, logger):
+    """
+    Returns the CalibrationIndex of all calibrations the user can see.
+
+    The index is cached per process. It is rebuilt when the number of
+    calibrations or the latest upload time changes, or after
+    CALIBRATION_INDEX_TTL seconds, e.g. if a calibration was edited.
+    """
+    user_id = data_archive.metadata.main_author.user_id
+    state = _calibration_state(data_archive)
+    with _calibration_indexes_lock:
+        cached = _calibration_indexes.get(user_id)
+    if (
+        cached is not None
+        and cached[0] == state
+        and time.monotonic() - cached[1] < CALIBRATION_INDEX_TTL
+    ):
+        return cached[2]
+
+    index = _build_calibration_index(data_archive, logger)
+    with _calibration_indexes_lock:
+        _calibration_indexes[user_id] = (state, time.monotonic(), index)
+    return index
+
+
+def get_concentration_reference(data_archive, logger, material, peak_value):
+    # This function looks up the UVvisConcentrationDetection calibrations in the calibration index.
+    # Selects suitable UVvisConcentrationDetection based on material and min/max peak_values.
+    # Computes the concentration of the given UVvisMeasurement based on slope and intercept of suitable UVvisConcentrationDetection.
+    # Returns a concentration.
+
+    index = get_calibration_index(data_archive, logger)
+    matching_calibrations = index.containing(material, peak_value)
+    nearest_calibration = None
+    if not matching_calibrations:
+        nearest_calibration = index.nearest(material, peak_value)
 
     calibration_reference = None
-    if len(matching_calibrations) == 0 and len(extrapolation_calibrations) == 0:
+    if not matching_calibrations and nearest_calibration is None:
         logger.warning('For the chosen material no calibration exists yet.')
     else:
-        if len(matching_calibrations) > 0:
+        if matching_calibrations:
             calibration_entry = matching_calibrations[0]
         else:
-            calibration_index = 0
-            if len(extrapolation_calibrations) > 1:
-                # find calibration with the peak area that is closest to the peak value of the current measurement
-                minimum_distance = abs(
-                    peak_value - extrapolation_calibrations[0]['minimum_peak_value']
-                )
-                for index, calibration in enumerate(extrapolation_calibrations):
-                    distance_start = abs(peak_value - calibration['minimum_peak_value'])
-                    distance_end = abs(peak_value - calibration['maximum_peak_value'])
-                    distance = min(distance_start, distance_end)
-                    if distance < minimum_distance:
-                        minimum_distance = distance
-                        calibration_index = index
-            calibration_entry = extrapolation_calibrations[calibration_index]
+            calibration_entry = nearest_calibration
             logger.warn(
                 'For the given peak value no UVvisConcentrationDetections exist.'
                 'The calibration is extrapolated based on the given material.'
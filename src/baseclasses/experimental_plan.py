@@ -21,11 +21,10 @@ import json
 import numpy as np
 from nomad.datamodel.data import ArchiveSection
 from nomad.datamodel.metainfo.eln import Entity
-from nomad.metainfo import MProxy, Quantity, Reference, Section, SubSection
+from nomad.metainfo import Quantity, Reference, Section, SubSection
 
 from . import BaseProcess, Batch, StandardSample
 from .customreadable_identifier import ReadableIdentifiersCustom
-from .wet_chemical_deposition import PrecursorSolution
 
 list_path = [
     'quenching/anti_solvent_2/name',
@@ -94,20 +93,9 @@ class ParametersVaried(ArchiveSection):
 
 
 def get_unit(section, path):
-    if isinstance(section, MProxy):
-        section.m_resolved()
-    path_split = path.split('/')
-    next_key = path_split[0]
-    if len(path_split) == 1:
-        return str(getattr(getattr(type(section), next_key), 'unit'))
-    elif isinstance(section, list):
-        return get_unit(section[np.int64(next_key)], '/'.join(path_split[1:]))
-    elif isinstance(section, PrecursorSolution):
-        section.solution_details = section.solution.m_copy(deep=True)
-        section.solution = None
-        return get_unit(section[next_key], '/'.join(path_split[1:]))
-    else:
-        return get_unit(section[next_key], '/'.join(path_split[1:]))
+    from .helper.parameter_paths import compile_parameter_path
+
+    return compile_parameter_path(section, path).unit
 
 
 class Step(ArchiveSection):
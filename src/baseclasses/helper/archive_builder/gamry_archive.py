@@ -1,6 +1,5 @@
 import inspect
 import os
-from datetime import datetime
 
 import numpy as np
 from nomad.units import ureg
@@ -22,6 +21,10 @@ from baseclasses.chemical_energy.voltammetry import (
     VoltammetryCycle,
     VoltammetryCycleWithPlot,
 )
+from baseclasses.helper.datetime_parsing import (
+    NOMAD_DATETIME_FORMAT,
+    gamry_datetime_parser,
+)
 
 
 def get_eis_properties(metadata):
@@ -220,14 +223,10 @@ def get_eis_data(data, cycle):
 
 def get_meta_datetime(metadata, entry):
     datetime_str = f'{metadata["DATE"]} {metadata["TIME"]}'
-    try:
-        datetime_object = datetime.strptime(datetime_str, '%d/%m/%Y %H:%M:%S')
-    except:
-        try:
-            datetime_object = datetime.strptime(datetime_str, '%m/%d/%Y %H:%M:%S')
-        except:
-            datetime_object = datetime.strptime(datetime_str, '%d.%m.%Y %H:%M:%S')
-    entry.datetime = datetime_object.strftime('%Y-%m-%d %H:%M:%S.%f')
+    datetime_object = gamry_datetime_parser.parse(datetime_str, source='gamry')
+    if datetime_object is None:
+        raise ValueError(f'Could not parse the Gamry date {datetime_str}')
+    entry.datetime = datetime_object.strftime(NOMAD_DATETIME_FORMAT)
 
 
 def get_meta_data(metadata, entry):
@@ -23,9 +23,50 @@ from nomad.units import ureg
 from baseclasses.solar_energy.jvmeasurement import (
     SolarCellJVCurveCustom,
     SolarCellJVCurveDarkCustom,
+    calculate_jv_parameters,
+    stack_jv_curves,
 )
 
 
+def get_jv_parameters(jv_dict):
+    """
+    Returns the parameters of the light curves in the units of the parsers.
+    If the parser did not provide the efficiencies, they are calculated for
+    all light curves at once, series and shunt resistance are None then.
+    """
+    if jv_dict.get('Efficiency') is not None:
+        return jv_dict
+
+    light_curves = [curve for curve in jv_dict['jv_curve'] if not curve.get('dark')]
+    parameters = calculate_jv_parameters(
+        *stack_jv_curves(
+            (curve['voltage'], curve['current_density']) for curve in light_curves
+        )
+    )
+    return {
+        'V_oc': parameters['open_circuit_voltage'],
+        'J_sc': parameters['short_circuit_current_density'],
+        'Fill_factor': parameters['fill_factor'] * 100,
+        'Efficiency': parameters['efficiency'],
+        'U_MPP': parameters['potential_at_maximum_power_point'],
+        'J_MPP': parameters['current_density_at_maximum_power_point'],
+        'R_ser': [None] * len(light_curves),
+        'R_par': [None] * len(light_curves),
+    }
+
+
+def _rounded(value, unit=None, scale=None):
+    # nan is kept like before, None comes from the calculated parameters
+    if value is None:
+        return None
+    value = round(value, 8)
+    if scale is not None:
+        value = value * scale
+    if unit is not None:
+        value = value * ureg(unit)
+    return value
+
+
 def get_jv_archive(jv_dict, mainfile, jvm, append=False):
     jvm.file_name = os.path.basename(mainfile)
     if jv_dict.get('datetime'):
@@ -40,6 +81,7 @@ def get_jv_archive(jv_dict, mainfile, jvm, append=False):
     jvm.compliance = jv_dict['compliance'] if 'compliance' in jv_dict else None
     if not append:
         jvm.jv_curve = []
+    parameters = get_jv_parameters(jv_dict)
     light_idx = 0
     for curve_idx, curve in enumerate(jv_dict['jv_curve']):
         if curve.get('dark'):
@@ -57,21 +99,20 @@ def get_jv_archive(jv_dict, mainfile, jvm, append=False):
                 light_intensity=jv_dict['intensity']
                 if 'intensity' in jv_dict
                 else None,
-                open_circuit_voltage=round(jv_dict['V_oc'][light_idx], 8) * ureg('V'),
-                short_circuit_current_density=round(jv_dict['J_sc'][light_idx], 8)
-                * ureg('mA/cm^2'),
-                fill_factor=round(jv_dict['Fill_factor'][light_idx], 8) * 0.01,
-                efficiency=round(jv_dict['Efficiency'][light_idx], 8),
-                potential_at_maximum_power_point=round(jv_dict['U_MPP'][light_idx], 8)
-                * ureg('V'),
-                current_density_at_maximun_power_point=round(
-                    jv_dict['J_MPP'][light_idx], 8
-                )
-                * ureg('mA/cm^2'),
-                series_resistance=round(jv_dict['R_ser'][light_idx], 8)
-                * ureg('ohm*cm^2'),
-                shunt_resistance=round(jv_dict['R_par'][light_idx], 8)
-                * ureg('ohm*cm^2'),
+                open_circuit_voltage=_rounded(parameters['V_oc'][light_idx], 'V'),
+                short_circuit_current_density=_rounded(
+                    parameters['J_sc'][light_idx], 'mA/cm^2'
+                ),
+                fill_factor=_rounded(parameters['Fill_factor'][light_idx], scale=0.01),
+                efficiency=_rounded(parameters['Efficiency'][light_idx]),
+                potential_at_maximum_power_point=_rounded(
+                    parameters['U_MPP'][light_idx], 'V'
+                ),
+                current_density_at_maximun_power_point=_rounded(
+                    parameters['J_MPP'][light_idx], 'mA/cm^2'
+                ),
+                series_resistance=_rounded(parameters['R_ser'][light_idx], 'ohm*cm^2'),
+                shunt_resistance=_rounded(parameters['R_par'][light_idx], 'ohm*cm^2'),
             )
             light_idx += 1
         jvm.jv_curve.append(jv_set)
@@ -1,5 +1,4 @@
 import inspect
-from datetime import datetime
 
 import numpy as np
 from nomad.units import ureg
@@ -15,6 +14,10 @@ from baseclasses.chemical_energy import (
     SubstanceWithConcentration,
     SubstrateProperties,
 )
+from baseclasses.helper.datetime_parsing import (
+    LABVIEW_EPOCH_OFFSET,
+    timestamps_to_datetimes,
+)
 
 
 def get_pint_from_string(magnitude_string, unit):
@@ -131,10 +134,8 @@ def get_tdms_archive(data, entry_object):
     timestamp_array = (
         np.array(data['READ_Timestamp']) if 'READ_Timestamp' in data.columns else None
     )
-    labview_to_unix_offset = (
-        datetime(1970, 1, 1) - datetime(1904, 1, 1)
-    ).total_seconds()
-    entry_object.timestamp = [
-        datetime.fromtimestamp(timestamp - labview_to_unix_offset)
-        for timestamp in timestamp_array
-    ]
+    entry_object.timestamp = (
+        timestamps_to_datetimes(timestamp_array, offset=LABVIEW_EPOCH_OFFSET)
+        if timestamp_array is not None
+        else None
+    )
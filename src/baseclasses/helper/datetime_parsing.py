@@ -0,0 +1,159 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+NOMAD_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+BATCH_DATE_FORMATS = [
+    '%d-%m-%Y',
+    '%d/%m/%Y',
+    '%d.%m.%Y',
+    '%Y-%m-%d',  # ISO date
+    '%d-%m-%y',
+    '%d/%m/%y',
+    '%Y-%m-%d %H:%M:%S',  # ISO with time
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%d-%m-%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%d.%m.%Y %H:%M:%S',
+]
+
+GAMRY_DATE_FORMATS = [
+    '%d/%m/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+    '%d.%m.%Y %H:%M:%S',
+]
+
+LABVIEW_EPOCH_OFFSET = (datetime(1970, 1, 1) - datetime(1904, 1, 1)).total_seconds()
+
+
+class DatetimeParser:
+    """
+    Parses date strings with a list of candidate formats.
+
+    The format that worked last is remembered per source (e.g. a column name)
+    and tried first for the next value of that source. Parsed values are
+    memoized, since the same dates are often repeated in large files.
+    Set `learn_formats` to False if the formats are ambiguous (e.g. day/month
+    and month/day), then the first matching format always wins.
+    """
+
+    def __init__(
+        self,
+        formats,
+        pandas_fallback=False,
+        learn_formats=True,
+        max_cached_values=10000,
+    ):
+        self.formats = list(formats)
+        self.learn_formats = learn_formats
+        self.pandas_fallback = pandas_fallback
+        self.max_cached_values = max_cached_values
+        self.learned_formats = {}
+        self._parsed = {}
+
+    def parse(self, value, source=None):
+        """
+        Args:
+            value: date string, surrounding whitespace is ignored
+            source: key of the format learned for this kind of value
+
+        Returns:
+            datetime: parsed value or None if no format matches
+        """
+        value = str(value).strip()
+        cache_key = (source, value)
+        if cache_key in self._parsed:
+            return self._parsed[cache_key]
+
+        parsed = self._parse(value, source)
+        if len(self._parsed) >= self.max_cached_values:
+            self._parsed.clear()
+        self._parsed[cache_key] = parsed
+        return parsed
+
+    def _parse(self, value, source):
+        learned_format = self.learned_formats.get(source)
+        if learned_format is not None:
+            try:
+                return datetime.strptime(value, learned_format)
+            except ValueError:
+                pass
+
+        for date_format in self.formats:
+            if date_format == learned_format:
+                continue
+            try:
+                parsed = datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+            if self.learn_formats:
+                self.learned_formats[source] = date_format
+            return parsed
+
+        if self.pandas_fallback:
+            try:
+                parsed = pd.to_datetime(value)
+            except Exception:
+                return None
+            if not pd.isna(parsed):
+                return parsed
+        return None
+
+    def parse_array(self, values, source=None):
+        """
+        Parse an array of date strings, every unique value is parsed once.
+        Missing values are returned as None.
+        """
+        values = pd.Series(values, dtype=object)
+        missing = values.isna().to_numpy()
+        strings = values.astype(str).str.strip().to_numpy()
+        unique_dates = {
+            date: self.parse(date, source) for date in pd.unique(strings[~missing])
+        }
+        return [
+            None if is_missing else unique_dates[date]
+            for date, is_missing in zip(strings, missing)
+        ]
+
+    def to_nomad(self, value, source=None):
+        parsed = self.parse(value, source)
+        return parsed.strftime(NOMAD_DATETIME_FORMAT) if parsed is not None else None
+
+
+def timestamps_to_datetimes(timestamps, offset=0.0):
+    """
+    Vectorized `datetime.fromtimestamp(timestamp - offset)` for an array of
+    seconds, the result is a list of naive datetimes in local time.
+    """
+    seconds = np.asarray(timestamps, dtype=float) - offset
+    local_times = (
+        pd.to_datetime(seconds, unit='s', utc=True)
+        .tz_convert(tz.tzlocal())
+        .tz_localize(None)
+    )
+    return list(local_times.to_pydatetime())
+
+
+batch_datetime_parser = DatetimeParser(BATCH_DATE_FORMATS, pandas_fallback=True)
+gamry_datetime_parser = DatetimeParser(GAMRY_DATE_FORMATS, learn_formats=False)
@@ -0,0 +1,275 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+ARCHIVE_READ_TIMEOUT_ENV = 'NOMAD_BASECLASSES_ARCHIVE_READ_TIMEOUT'
+
+# seconds to wait for each archive read by `read_archives`
+ARCHIVE_READ_TIMEOUT = float(os.environ.get(ARCHIVE_READ_TIMEOUT_ENV, '60'))
+
+_MISSING = object()
+
+
+def get_path(data, path, default=None):
+    """Returns the value at the dotted `path` of nested dicts or `default`."""
+    for key in path.split('.'):
+        try:
+            data = data[key]
+        except (KeyError, TypeError, IndexError):
+            return default
+    return data
+
+
+def _is_list(value):
+    return isinstance(value, list | tuple) or hasattr(value, 'to_list')
+
+
+def _to_python(value):
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'to_list'):
+        return value.to_list()
+    return value
+
+
+def _project(source, keys):
+    """Copy the value at `keys` with its parents, like a search include."""
+    if not keys:
+        return _to_python(source)
+    if _is_list(source):
+        projected = (_project(item, keys) for item in source)
+        return [{} if item is _MISSING else item for item in projected]
+    try:
+        value = source[keys[0]]
+    except (KeyError, TypeError):
+        return _MISSING
+    value = _project(value, keys[1:])
+    return _MISSING if value is _MISSING else {keys[0]: value}
+
+
+def _merge(target, projected):
+    if isinstance(target, dict) and isinstance(projected, dict):
+        for key, value in projected.items():
+            target[key] = _merge(target[key], value) if key in target else value
+        return target
+    if isinstance(target, list) and isinstance(projected, list):
+        return [_merge(item, other) for item, other in zip(target, projected)]
+    return projected
+
+
+def read_projected_archive(upload_id, entry_id, include):
+    """
+    Read only the `include` paths of an archive into a dict shaped like a
+    search hit.
+    """
+    from nomad import files
+
+    hit = {'upload_id': upload_id, 'entry_id': entry_id}
+    with files.UploadFiles.get(upload_id=upload_id).read_archive(
+        entry_id=entry_id
+    ) as arch:
+        entry_archive = arch[entry_id]
+        for path in include:
+            projected = _project(entry_archive, path.split('.'))
+            if projected is not _MISSING:
+                _merge(hit, projected)
+    return hit
+
+
+def search_projected(  # noqa: PLR0913
+    archive,
+    query,
+    include,
+    required=(),
+    *,
+    page_size=100,
+    max_workers=8,
+    timeout=ARCHIVE_READ_TIMEOUT,
+    logger=None,
+):
+    """
+    Search entries and return only the `include` paths of each hit.
+
+    Hits which miss one of the `required` paths, because the search index
+    does not contain it, are completed from the archive. Only these entries
+    are opened.
+
+    Args:
+        archive: archive of the searching entry, provides the user
+        query: search query
+        include: dotted paths of the hits, e.g. ['data.name', 'data.m_def']
+        required: paths that every entry has, if they are indexed
+        page_size: maximum number of hits
+        max_workers, timeout, logger: see `read_archives`
+
+    Returns:
+        list: hits as nested dicts with `upload_id` and `entry_id`
+    """
+    include = list(dict.fromkeys([*include, *required]))
+    search_result = _search_page(archive, query, include, page_size)
+    return complete_projected_hits(
+        search_result.data,
+        include,
+        required,
+        max_workers=max_workers,
+        timeout=timeout,
+        logger=logger,
+    )
+
+
+def iter_projected(  # noqa: PLR0913
+    archive,
+    query,
+    include,
+    required=(),
+    *,
+    page_size=100,
+    max_workers=8,
+    timeout=ARCHIVE_READ_TIMEOUT,
+    logger=None,
+):
+    """
+    Like `search_projected`, but walks all pages of the search with
+    `page_after_value` and yields the hits one by one, `page_size` is the
+    number of hits per search request.
+    """
+    include = list(dict.fromkeys([*include, *required]))
+    page_after_value = None
+    while True:
+        search_result = _search_page(
+            archive, query, include, page_size, page_after_value
+        )
+        yield from complete_projected_hits(
+            search_result.data,
+            include,
+            required,
+            max_workers=max_workers,
+            timeout=timeout,
+            logger=logger,
+        )
+        page_after_value = search_result.pagination.next_page_after_value
+        if not search_result.data or page_after_value is None:
+            return
+
+
+def _search_page(archive, query, include, page_size, page_after_value=None):
+    from nomad.app.v1.models import MetadataPagination, MetadataRequired
+    from nomad.search import search
+
+    pagination = MetadataPagination()
+    pagination.page_size = page_size
+    pagination.page_after_value = page_after_value
+    return search(
+        owner='all',
+        query=query,
+        pagination=pagination,
+        required=MetadataRequired(include=['upload_id', 'entry_id', *include]),
+        user_id=archive.metadata.main_author.user_id,
+    )
+
+
+def complete_projected_hits(  # noqa: PLR0913
+    hits,
+    include,
+    required,
+    *,
+    max_workers=8,
+    timeout=ARCHIVE_READ_TIMEOUT,
+    logger=None,
+):
+    """
+    Complete the hits which miss a required path with the projection read
+    from their archives, the archives are read concurrently. If an archive
+    cannot be read, its hit is returned as it is. See `read_archives` for
+    the keyword arguments.
+    """
+    incomplete = [
+        hit
+        for hit in hits
+        if any(get_path(hit, path, _MISSING) is _MISSING for path in required)
+    ]
+    projections = read_archives(
+        ((hit['upload_id'], hit['entry_id'], include) for hit in incomplete),
+        max_workers=max_workers,
+        timeout=timeout,
+        logger=logger,
+    )
+    for hit, projected in zip(incomplete, projections):
+        if projected is not None:
+            _merge(hit, projected)
+    return hits
+
+
+def read_archives(
+    requests, *, max_workers=8, timeout=ARCHIVE_READ_TIMEOUT, logger=None
+):
+    """
+    Read the projections of many archives with a bounded thread pool.
+
+    Args:
+        requests: iterable of (upload_id, entry_id, include), see
+            `read_projected_archive`
+        max_workers: maximum number of archives read at the same time
+        timeout: seconds to wait for each archive
+        logger: reports the archives that could not be read, nomad's logger
+            if None
+
+    Returns:
+        list: projections in the order of `requests`, None for archives that
+            could not be read in time or failed
+    """
+    requests = list(requests)
+    if not requests:
+        return []
+
+    if logger is None:
+        from nomad import utils
+
+        logger = utils.get_logger(__name__)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(requests)))
+    futures = []
+    try:
+        futures = [
+            executor.submit(read_projected_archive, *request) for request in requests
+        ]
+        projections = []
+        for (upload_id, entry_id, _), future in zip(requests, futures):
+            try:
+                projections.append(future.result(timeout=timeout))
+            except Exception as e:
+                logger.warning(
+                    f'Could not read archive {upload_id}/{entry_id}', exc_info=e
+                )
+                projections.append(None)
+        return projections
+    finally:
+        # a hanging read must not block the caller, the reads which did not
+        # start are cancelled, the running ones cannot be stopped
+        executor.shutdown(wait=False, cancel_futures=True)
+        running = [
+            f'{upload_id}/{entry_id}'
+            for (upload_id, entry_id, _), future in zip(requests, futures)
+            if future.running()
+        ]
+        if running:
+            logger.warning(
+                f'Archive reads still running after the timeout: {", ".join(running)}'
+            )
@@ -23,14 +23,16 @@ from nomad.units import ureg
 
 from baseclasses import PubChemPureSubstanceSectionCustom
 
+from ..helper.parameter_paths import compile_parameter_path
 from ..helper.utilities import (
+    BulkArchiveWriter,
+    JsonPatchBuffer,
     add_section_markdown,
     convert_datetime,
     create_archive,
     get_entry_id_from_file_name,
     get_reference,
     get_solutions,
-    rewrite_json,
 )
 from ..solar_energy import SolarCellProperties
 from ..solution import OtherSolution
@@ -76,13 +78,20 @@ def set_value(section, path, value, unit):
         set_value(section[next_key], '/'.join(path_split[1:]), value, unit)
 
 
-def set_process_parameters(process, parameters, i, plan_obj, logger):
+def set_process_parameters(  # noqa: PLR0913, PLR0917
+    process, parameters, i, plan_obj, logger, paths=None
+):
+    # paths: parameter path -> compiled path of the step, see compile_step_paths
     names = []
     for p in parameters:
         if p[0] == i:
             names.append(str(p[2]).replace('/', ''))
+            path = paths.get(p[1]) if paths else None
             try:
-                set_value(process, p[1], p[2], p[3])
+                if path is None:
+                    set_value(process, p[1], p[2], p[3])
+                else:
+                    path.set(process, p[2], p[3])
             except Exception:
                 log_error(
                     plan_obj,
@@ -92,7 +101,30 @@ def set_process_parameters(process, parameters, i, plan_obj, logger):
     process.name += f' {",".join(names)}'
 
 
-def add_sample(plan_obj, archive, idx1, idx2, sample_cls):
+def compile_step_paths(template, step):
+    paths = {}
+    for parameter in step.parameters:
+        try:
+            paths[parameter.parameter_path] = compile_parameter_path(
+                template, parameter.parameter_path
+            )
+        except Exception:
+            # invalid paths are reported by set_value for every value
+            paths[parameter.parameter_path] = None
+    return paths
+
+
+def create_plan_archive(entity, archive, file_name, archive_writer=None):
+    # with a BulkArchiveWriter the archive is staged and written with the others
+    if archive_writer is None:
+        create_archive(entity, archive, file_name, overwrite=True)
+    else:
+        archive_writer.add(entity, file_name, overwrite=True)
+
+
+def add_sample(  # noqa: PLR0913, PLR0917
+    plan_obj, archive, idx1, idx2, sample_cls, archive_writer=None
+):
     subs = plan_obj.solar_cell_properties.substrate
     architecture = plan_obj.solar_cell_properties.architecture
 
@@ -106,12 +138,20 @@ def add_sample(plan_obj, archive, idx1, idx2, sample_cls):
         substrate=subs,
         architecture=architecture,
     )
-    create_archive(sample, archive, file_name, overwrite=True)
+    create_plan_archive(sample, archive, file_name, archive_writer)
     entry_id = get_entry_id_from_file_name(file_name, archive)
     return entry_id
 
 
-def add_batch(plan_obj, archive, batch_cls, sample_refs, is_subbatch, idx1=None):
+def add_batch(  # noqa: PLR0913, PLR0917
+    plan_obj,
+    archive,
+    batch_cls,
+    sample_refs,
+    is_subbatch,
+    idx1=None,
+    archive_writer=None,
+):
     file_name = f'{plan_obj.lab_id}'
     if is_subbatch:
         file_name += f'_{idx1}'
@@ -136,7 +176,7 @@ def add_batch(plan_obj, archive, batch_cls, sample_refs, is_subbatch, idx1=None)
     )
     if is_subbatch and plan_obj.substrates_per_subbatch == 1:
         return
-    create_archive(batch, archive, file_name, overwrite=True)
+    create_plan_archive(batch, archive, file_name, archive_writer)
     entry_id = get_entry_id_from_file_name(file_name, archive)
     return entry_id
 
@@ -172,7 +212,9 @@ def create_documentation(plan_obj, archive, md, solution_list):
     plan_obj.batch_plan_pdf = output
 
 
-def add_process(plan_obj, archive, step, process, idx1, idx2):
+def add_process(  # noqa: PLR0913, PLR0917
+    plan_obj, archive, step, process, idx1, idx2, archive_writer=None
+):
     file_name_base = (
         f'{plan_obj.lab_id}_{idx1}' if step.vary_parameters else f'{plan_obj.lab_id}'
     )
@@ -208,20 +250,27 @@ def add_process(plan_obj, archive, step, process, idx1, idx2):
 
     if not process.datetime:
         process.datetime = plan_obj.datetime if plan_obj.datetime else ''
-    create_archive(process, archive, file_name_process, overwrite=True)
+    create_plan_archive(process, archive, file_name_process, archive_writer)
     return file_name_base
 
 
-def set_false(plan_obj, archive):
+def set_false(plan_obj, patches):
     plan_obj.load_standard_processes = False
-    rewrite_json(['data', 'load_standard_processes'], archive, False)
+    patches.rewrite_json(['data', 'load_standard_processes'], False)
     plan_obj.create_samples_and_processes = False
-    rewrite_json(['data', 'create_samples_and_processes'], archive, False)
+    patches.rewrite_json(['data', 'create_samples_and_processes'], False)
 
 
 def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=None):
+    # all changes of the plan json are written once at the end
+    with JsonPatchBuffer(archive) as patches:
+        run_solar_sample_plan(plan_obj, patches, sample_cls, batch_cls, logger)
+
+
+def run_solar_sample_plan(plan_obj, patches, sample_cls, batch_cls, logger):
+    archive = patches.archive
     if plan_obj.plan_is_created:
-        set_false(plan_obj, archive)
+        set_false(plan_obj, patches)
         log_error(
             plan_obj,
             logger,
@@ -239,7 +288,7 @@ def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=N
         plan_obj.number_of_substrates >= 0
         and plan_obj.number_of_substrates % plan_obj.substrates_per_subbatch == 0
     ):
-        set_false(plan_obj, archive)
+        set_false(plan_obj, patches)
         log_error(
             plan_obj,
             logger,
@@ -253,7 +302,7 @@ def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=N
 
     # standard process integration
     if plan_obj.load_standard_processes:
-        set_false(plan_obj, archive)
+        set_false(plan_obj, patches)
         if plan_obj.plan_is_loaded:
             log_error(
                 plan_obj,
@@ -324,28 +373,36 @@ def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=N
                 parameters[j].append(p)
 
         for i, step in enumerate(plan_obj.plan):
+            # a section has a single parent, so every sub-batch process is
+            # its own deep copy of the template and cannot share its sections
+            template = step.process_reference.m_resolved()
+            paths = compile_step_paths(template, step)
             if not step.vary_parameters:
-                process = step.process_reference.m_resolved().m_copy(deep=True)
-                set_process_parameters(process, parameters_single, i, plan_obj, logger)
+                process = template.m_copy(deep=True)
+                set_process_parameters(
+                    process, parameters_single, i, plan_obj, logger, paths
+                )
                 plan_obj.plan[i].batch_processes = [process]
                 continue
 
             if step.parameters:
                 batch_processes = []
                 for j in range(number_of_subbatches):
-                    process = step.process_reference.m_resolved().m_copy(deep=True)
-                    set_process_parameters(process, parameters[j], i, plan_obj, logger)
+                    process = template.m_copy(deep=True)
                     set_process_parameters(
-                        process, parameters_single, i, plan_obj, logger
+                        process, parameters[j], i, plan_obj, logger, paths
+                    )
+                    set_process_parameters(
+                        process, parameters_single, i, plan_obj, logger, paths
                     )
                     batch_processes.append(process)
                 plan_obj.plan[i].batch_processes = batch_processes
             else:
                 plan_obj.plan[i].batch_processes = [
-                    step.process_reference.m_resolved().m_copy(deep=True)
+                    template.m_copy(deep=True)
                 ] * number_of_subbatches
         plan_obj.plan_is_loaded = True
-        rewrite_json(['data', 'plan_is_loaded'], archive, True)
+        patches.rewrite_json(['data', 'plan_is_loaded'], True)
 
     # process, sample and batch creation
     if (
@@ -353,21 +410,46 @@ def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=N
         and plan_obj.lab_id
         and plan_obj.solar_cell_properties
     ):
-        set_false(plan_obj, archive)
+        set_false(plan_obj, patches)
+        archive_writer = BulkArchiveWriter(
+            archive, logger, manifest_file=f'batch_plan_{plan_obj.lab_id}.manifest.json'
+        )
 
         # create samples and batches
         sample_refs = []
         for idx1 in range(number_of_subbatches):
             sample_refs_subbatch = []
             for idx2 in range(plan_obj.substrates_per_subbatch):
-                entry_id = add_sample(plan_obj, archive, idx1, idx2, sample_cls)
+                entry_id = add_sample(
+                    plan_obj,
+                    archive,
+                    idx1,
+                    idx2,
+                    sample_cls,
+                    archive_writer=archive_writer,
+                )
                 sample_refs_subbatch.append(
                     get_reference(archive.metadata.upload_id, entry_id)
                 )
             sample_refs.append(sample_refs_subbatch)
-            add_batch(plan_obj, archive, batch_cls, [sample_refs_subbatch], True, idx1)
+            add_batch(
+                plan_obj,
+                archive,
+                batch_cls,
+                [sample_refs_subbatch],
+                True,
+                idx1,
+                archive_writer=archive_writer,
+            )
 
-        batch_entry_id = add_batch(plan_obj, archive, batch_cls, sample_refs, False)
+        batch_entry_id = add_batch(
+            plan_obj,
+            archive,
+            batch_cls,
+            sample_refs,
+            False,
+            archive_writer=archive_writer,
+        )
         plan_obj.batch_reference = get_reference(
             archive.metadata.upload_id, batch_entry_id
         )
@@ -380,7 +462,13 @@ def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=N
                 if not batch_process.present:
                     continue
                 file_name_base = add_process(
-                    plan_obj, archive, step, batch_process, idx1, idx2
+                    plan_obj,
+                    archive,
+                    step,
+                    batch_process,
+                    idx1,
+                    idx2,
+                    archive_writer=archive_writer,
                 )
                 md = add_section_markdown(md, idx2, idx1, batch_process, file_name_base)
                 if 'solution' not in batch_process:
@@ -391,10 +479,11 @@ def execute_solar_sample_plan(plan_obj, archive, sample_cls, batch_cls, logger=N
                     elif getattr(s, 'solution'):
                         solution_list.append(s['solution'])
 
+        archive_writer.write()
         create_documentation(plan_obj, archive, md, solution_list)
 
         plan_obj.plan_is_created = True
-        rewrite_json(['data', 'plan_is_created'], archive, True)
-        rewrite_json(['data', 'description'], archive, plan_obj.description)
+        patches.rewrite_json(['data', 'plan_is_created'], True)
+        patches.rewrite_json(['data', 'description'], plan_obj.description)
 
-    set_false(plan_obj, archive)
+    set_false(plan_obj, patches)
@@ -0,0 +1,144 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from functools import cache
+
+from nomad.metainfo import MProxy, MSection, Reference, SubSection
+from nomad.units import ureg
+
+from baseclasses import PubChemPureSubstanceSectionCustom
+from baseclasses.helper.utilities import convert_datetime
+from baseclasses.solution import OtherSolution
+from baseclasses.wet_chemical_deposition import PrecursorSolution
+
+PUBCHEM_REPLACED_KEYS = ('anti_solvent_2', 'chemcial_2')
+
+
+@cache
+def get_parameter_unit(unit):
+    return ureg(unit)
+
+
+def _resolve(section):
+    if isinstance(section, MProxy):
+        return section.m_resolved()
+    return section
+
+
+def _walk_definitions(section, keys):
+    """
+    Follow `keys` through a section instance and its section definitions.
+
+    The instance is used where it exists, so quantities of derived sections
+    are found. Missing subsections fall back to the declared definition.
+    """
+    section = _resolve(section)
+    section_def = section.m_def
+    in_list = False
+    for key in keys[:-1]:
+        if in_list:
+            index = int(key)
+            section = section[index] if section and index < len(section) else None
+            if section is not None:
+                section_def = section.m_def
+            in_list = False
+            continue
+
+        if isinstance(section, PrecursorSolution | OtherSolution) and (
+            key == 'solution_details' and not section.solution_details
+        ):
+            # set_value copies the referenced solution into solution_details
+            solution = _resolve(section.solution)
+            if solution is not None:
+                section, section_def = solution, solution.m_def
+                continue
+
+        prop = section_def.all_properties[key]
+        child = _resolve(getattr(section, key, None)) if section is not None else None
+        if isinstance(prop, SubSection):
+            section_def = prop.sub_section.m_resolved()
+            in_list = prop.repeats
+        elif isinstance(prop.type, Reference):
+            section_def = prop.type.target_section_def.m_resolved()
+            in_list = bool(prop.shape)
+        else:
+            raise KeyError(f'{key} is neither a subsection nor a reference')
+        section = child
+        if isinstance(section, MSection):
+            section_def = section.m_def
+
+    if in_list:
+        raise KeyError(f'{"/".join(keys)} ends in a list')
+    return section_def.all_quantities[keys[-1]]
+
+
+class ParameterPath:
+    """
+    A `ParametersVaried.parameter_path` validated once against a process.
+
+    The path is split once and its quantity definition and unit are resolved
+    when the path is compiled. `set` applies one parameter value to a copy of
+    the process like `execute_solar_sample_plan.set_value`, without parsing
+    or validating the path again.
+    """
+
+    def __init__(self, section, path):
+        self.path = path
+        self.keys = tuple(path.split('/'))
+        self.quantity = _walk_definitions(section, self.keys)
+        self.unit = str(self.quantity.unit)
+
+    def get(self, section):
+        for key in self.keys:
+            section = section[int(key)] if isinstance(section, list) else section[key]
+        return section
+
+    def set(self, section, value, unit=None):
+        for key in self.keys[:-1]:
+            if isinstance(section, list):
+                section = section[int(key)]
+                continue
+            if isinstance(section, PrecursorSolution | OtherSolution):
+                if not section.solution_details:
+                    section.solution_details = section.solution.m_copy(deep=True)
+            elif key in PUBCHEM_REPLACED_KEYS and isinstance(
+                section[key], PubChemPureSubstanceSectionCustom
+            ):
+                setattr(
+                    section, key, PubChemPureSubstanceSectionCustom(load_data=False)
+                )
+            section = section[key]
+
+        key = self.keys[-1]
+        if unit and unit != 'None':
+            value = ureg.Quantity(float(value), get_parameter_unit(unit))
+        elif key == 'datetime':
+            value = convert_datetime(value, datetime_format='%d/%m/%Y %H:%M', utc=False)
+        setattr(section, key, value)
+
+
+def compile_parameter_path(section, path):
+    """
+    Args:
+        section: process section (or proxy) the path starts from
+        path: `parameter_path`, e.g. 'solution/0/solution_details/datetime'
+
+    Returns:
+        ParameterPath: raises a KeyError or AttributeError for invalid paths
+    """
+    return ParameterPath(section, path)
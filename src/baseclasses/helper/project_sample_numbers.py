@@ -0,0 +1,412 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import abc
+import os
+import sqlite3
+from collections import namedtuple
+
+PROJECT_SAMPLE_NUMBER_DIGITS = 4
+
+SAMPLE_NUMBER_STORE_ENV = 'NOMAD_BASECLASSES_SAMPLE_NUMBER_STORE'
+
+# entries fetched per request of the sorted search and of the fallback scan
+SampleNumberSearch = namedtuple(
+    'SampleNumberSearch', ['page_size', 'scan_page_size'], defaults=[10, 1000]
+)
+
+
+def parse_project_sample_number(lab_id, lab_id_base, separator='_'):
+    """
+    Returns the project sample number of `lab_id`, e.g. 7 for
+    'HZB_PROJ_JoDo_0007' with the base 'HZB_PROJ_JoDo', or None.
+    """
+    prefix = f'{lab_id_base}{separator}'
+    if not lab_id.startswith(prefix):
+        return None
+    suffix = lab_id[len(prefix) :]
+    if len(suffix) != PROJECT_SAMPLE_NUMBER_DIGITS or not suffix.isdigit():
+        return None
+    return int(suffix)
+
+
+def _project_sample_numbers(lab_ids, lab_id_base, separator):
+    for lab_id in lab_ids:
+        number = parse_project_sample_number(lab_id, lab_id_base, separator)
+        if number is not None:
+            yield number
+
+
+def _iter_lab_id_entries(archive, query, page_size, order_by=None, max_page_size=None):
+    from nomad.app.v1.models import MetadataPagination, MetadataRequired
+    from nomad.search import search
+
+    required = MetadataRequired(include=['entry_id', 'results.eln.lab_ids'])
+    page_after_value = None
+    while True:
+        pagination = MetadataPagination()
+        pagination.page_size = page_size
+        pagination.page_after_value = page_after_value
+        if order_by is not None:
+            pagination.order_by = order_by
+            pagination.order = 'desc'
+        search_result = search(
+            owner='all',
+            query=query,
+            pagination=pagination,
+            required=required,
+            user_id=archive.metadata.main_author.user_id,
+        )
+        for entry in search_result.data:
+            yield entry['entry_id'], entry['results']['eln']['lab_ids']
+        page_after_value = search_result.pagination.next_page_after_value
+        if not search_result.data or page_after_value is None:
+            return
+        if max_page_size is not None:
+            page_size = min(2 * page_size, max_page_size)
+
+
+def _own_project_sample_number(archive, query, lab_id_base, separator):
+    entry_id = archive.metadata.entry_id
+    if entry_id is None:
+        return None
+    query = dict(query, entry_id=entry_id)
+    for _, lab_ids in _iter_lab_id_entries(archive, query, page_size=1):
+        return parse_project_sample_number(lab_ids[0], lab_id_base, separator)
+    return None
+
+
+def _max_project_sample_number(archive, query, lab_id_base, separator, options):
+    """
+    Walks the entries sorted descending by their largest lab id. The numbers
+    are zero padded, so the walk stops at the first entry whose largest lab
+    id is a numbered lab id of the base, all later entries have smaller ones.
+    Lab ids sorting above the numbered ones, e.g. of other bases, make the
+    walk longer, so the pages grow up to the page size of the scan.
+    """
+    numbers = [0]
+    entries = _iter_lab_id_entries(
+        archive,
+        query,
+        options.page_size,
+        order_by='results.eln.lab_ids',
+        max_page_size=options.scan_page_size,
+    )
+    for _, lab_ids in entries:
+        numbers.extend(_project_sample_numbers(lab_ids, lab_id_base, separator))
+        largest = parse_project_sample_number(max(lab_ids), lab_id_base, separator)
+        if largest is not None:
+            break
+    return max(numbers)
+
+
+def _scan_project_sample_numbers(archive, query, lab_id_base, separator, page_size):
+    numbers = [0]
+    for _, lab_ids in _iter_lab_id_entries(archive, query, page_size):
+        numbers.extend(_project_sample_numbers(lab_ids, lab_id_base, separator))
+    return max(numbers)
+
+
+def _lab_id_base_query(lab_id_base, entry_type):
+    query = {'results.eln.lab_ids': lab_id_base}
+    if entry_type is not None:
+        query['entry_type'] = entry_type
+    return query
+
+
+def _seed_project_sample_number(archive, lab_id_base, separator, entry_type, options):
+    query = _lab_id_base_query(lab_id_base, entry_type)
+    try:
+        number = _max_project_sample_number(
+            archive, query, lab_id_base, separator, options
+        )
+    except Exception:
+        number = _scan_project_sample_numbers(
+            archive, query, lab_id_base, separator, options.scan_page_size
+        )
+    return number + 1
+
+
+def next_project_sample_number(
+    archive, lab_id_base, separator='_', entry_type=None, options=SampleNumberSearch()
+):
+    """
+    Find the next free project sample number of a lab id base.
+
+    Only the entries with the highest lab ids are fetched. If the search
+    backend cannot sort by lab ids, all entries of the base are scanned page
+    by page. An entry which already has a number of the base keeps it.
+
+    Args:
+        archive: archive of the sample, provides the user and entry id
+        lab_id_base: lab id without the number, e.g. 'HZB_PROJ_JoDo'
+        separator: between the base and the number
+        entry_type: only consider entries of this type
+        options: `SampleNumberSearch` with the page sizes of the searches
+
+    Returns:
+        int: project sample number, starting at 1
+    """
+    query = _lab_id_base_query(lab_id_base, entry_type)
+    own_number = _own_project_sample_number(archive, query, lab_id_base, separator)
+    if own_number is not None:
+        return own_number
+
+    return _seed_project_sample_number(
+        archive, lab_id_base, separator, entry_type, options
+    )
+
+
+def _project_sample_number_taken(archive, lab_id):
+    """True if another entry than the archive's one has `lab_id`."""
+    from nomad.search import search
+
+    search_result = search(
+        owner='all',
+        query={'results.eln.lab_ids': lab_id},
+        user_id=archive.metadata.main_author.user_id,
+    )
+    entry_ids = [entry['entry_id'] for entry in search_result.data]
+    return len(entry_ids) != 0 and archive.metadata.entry_id not in entry_ids
+
+
+class SampleNumberStore(abc.ABC):
+    """
+    Hands out project sample numbers per lab id base.
+
+    A reservation is atomic and stored per entry, so parallel workers never
+    get the same number and normalizing an entry again returns its number.
+    """
+
+    @abc.abstractmethod
+    def current(self, key):
+        """Returns the last reserved number of `key` or None if it is unknown."""
+
+    @abc.abstractmethod
+    def seeded(self, key):
+        """
+        Returns the largest number of `key` given out before the store knew
+        it, i.e. `minimum - 1` of its first reservation, or None if unknown.
+        """
+
+    @abc.abstractmethod
+    def reserve(self, key, entry_id, minimum=1):
+        """Reserve the next number of `key`, which is at least `minimum`."""
+
+    @abc.abstractmethod
+    def claim(self, key, entry_id, value):
+        """
+        Reserve the given number of `key` for the entry. Returns False if
+        another entry holds it.
+        """
+
+
+class SQLiteSampleNumberStore(SampleNumberStore):
+    """
+    Counter store in a SQLite file. `BEGIN IMMEDIATE` locks the database file
+    for the reservation, which makes it safe across processes on one host.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS counters '
+                '(key TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS reservations '
+                '(key TEXT, entry_id TEXT, value INTEGER NOT NULL, '
+                'PRIMARY KEY (key, entry_id))'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS seeds '
+                '(key TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+
+    def current(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT value FROM counters WHERE key = ?', (key,)
+            ).fetchone()
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    def seeded(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT value FROM seeds WHERE key = ?', (key,)
+            ).fetchone()
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    def reserve(self, key, entry_id, minimum=1):
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT value FROM reservations WHERE key = ? AND entry_id = ?',
+                (key, entry_id),
+            ).fetchone()
+            if row:
+                connection.execute('COMMIT')
+                return row[0]
+
+            row = connection.execute(
+                'SELECT value FROM counters WHERE key = ?', (key,)
+            ).fetchone()
+            value = max(row[0] + 1 if row else 1, minimum)
+            if not row:
+                connection.execute(
+                    'INSERT OR IGNORE INTO seeds (key, value) VALUES (?, ?)',
+                    (key, minimum - 1),
+                )
+            connection.execute(
+                'INSERT OR REPLACE INTO counters (key, value) VALUES (?, ?)',
+                (key, value),
+            )
+            if entry_id is not None:
+                connection.execute(
+                    'INSERT INTO reservations (key, entry_id, value) VALUES (?, ?, ?)',
+                    (key, entry_id, value),
+                )
+            connection.execute('COMMIT')
+            return value
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+    def claim(self, key, entry_id, value):
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT entry_id FROM reservations '
+                'WHERE key = ? AND value = ? AND entry_id IS NOT ?',
+                (key, value, entry_id),
+            ).fetchone()
+            if row:
+                connection.execute('COMMIT')
+                return False
+
+            connection.execute(
+                'INSERT INTO counters (key, value) VALUES (?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)',
+                (key, value),
+            )
+            if entry_id is not None:
+                connection.execute(
+                    'INSERT OR REPLACE INTO reservations (key, entry_id, value) '
+                    'VALUES (?, ?, ?)',
+                    (key, entry_id, value),
+                )
+            connection.execute('COMMIT')
+            return True
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+
+sample_number_store = None
+
+
+def set_sample_number_store(store):
+    global sample_number_store  # noqa: PLW0603
+    sample_number_store = store
+
+
+def get_sample_number_store():
+    """
+    Returns the configured store. Without one, a SQLite store is created if
+    the environment variable NOMAD_BASECLASSES_SAMPLE_NUMBER_STORE points to
+    a database file, otherwise None.
+    """
+    if sample_number_store is None and os.environ.get(SAMPLE_NUMBER_STORE_ENV):
+        set_sample_number_store(
+            SQLiteSampleNumberStore(os.environ[SAMPLE_NUMBER_STORE_ENV])
+        )
+    return sample_number_store
+
+
+def _store_key(lab_id_base, separator, entry_type):
+    return f'{entry_type or ""}:{lab_id_base}{separator}'
+
+
+def reserve_project_sample_number(
+    archive,
+    lab_id_base,
+    separator='_',
+    entry_type=None,
+    store=None,
+):
+    """
+    Reserve the next project sample number of a lab id base for the entry.
+
+    The search is only used to seed the counter of a lab id base the store
+    has not seen yet. Without a store, `next_project_sample_number` is used.
+
+    Returns:
+        int: project sample number, starting at 1
+    """
+    store = store or get_sample_number_store()
+    if store is None:
+        return next_project_sample_number(
+            archive, lab_id_base, separator=separator, entry_type=entry_type
+        )
+
+    key = _store_key(lab_id_base, separator, entry_type)
+    minimum = 1
+    if store.current(key) is None:
+        minimum = _seed_project_sample_number(
+            archive, lab_id_base, separator, entry_type, SampleNumberSearch()
+        )
+    return store.reserve(key, archive.metadata.entry_id, minimum)
+
+
+def claim_project_sample_number(archive, lab_id_base, number, store=None):
+    """
+    Returns True if the entry can keep the project sample number `number` of
+    the lab id base, i.e. no other entry has the lab id with this number.
+
+    A store which knows the lab id base answers without a search for the
+    numbers it gave out itself and keeps the number reserved for the entry.
+    Numbers up to the seed of the store, which may belong to entries created
+    before the store, and numbers of unknown bases are searched.
+    """
+    store = store or get_sample_number_store()
+    key = _store_key(lab_id_base, '_', None)
+    seeded = store.seeded(key) if store is not None else None
+    if seeded is None or number <= seeded:
+        lab_id = f'{lab_id_base}_{number:0{PROJECT_SAMPLE_NUMBER_DIGITS}d}'
+        if _project_sample_number_taken(archive, lab_id):
+            return False
+        if store is None or store.current(key) is None:
+            return True
+    return store.claim(key, archive.metadata.entry_id, number)
@@ -0,0 +1,61 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import importlib
+from functools import cache
+
+
+@cache
+def resolve_section_class(qualified_name):
+    """
+    Returns the class of a qualified section name, e.g. the `m_def` of an
+    archive 'baseclasses.solar_energy.jvmeasurement.JVMeasurement', or None
+    if it cannot be imported. The longest importable module prefix is used.
+    """
+    module_name, attributes = qualified_name, []
+    while '.' in module_name:
+        module_name, _, attribute = module_name.rpartition('.')
+        attributes.insert(0, attribute)
+        try:
+            section_class = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        try:
+            for attribute in attributes:
+                section_class = getattr(section_class, attribute)
+        except AttributeError:
+            return None
+        return section_class if isinstance(section_class, type) else None
+    return None
+
+
+@cache
+def get_section_flags(qualified_name, base_classes):
+    """
+    Args:
+        qualified_name: qualified section name, see `resolve_section_class`
+        base_classes: tuple of classes
+
+    Returns:
+        tuple: for every base class if the section inherits from it
+    """
+    section_class = resolve_section_class(qualified_name)
+    return tuple(
+        section_class is not None and issubclass(section_class, base_class)
+        for base_class in base_classes
+    )
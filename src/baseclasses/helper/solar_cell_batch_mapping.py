@@ -1,11 +1,17 @@
-from datetime import datetime
+from functools import cache, lru_cache
 
+import numpy as np
 import pandas as pd
 from nomad.datamodel.metainfo.basesections import CompositeSystemReference
 from nomad.units import ureg
 
 from baseclasses import LayerProperties, PubChemPureSubstanceSectionCustom
 from baseclasses.atmosphere import Atmosphere, GloveboxAtmosphere
+from baseclasses.helper.datetime_parsing import (
+    BATCH_DATE_FORMATS,
+    NOMAD_DATETIME_FORMAT,
+    batch_datetime_parser,
+)
 from baseclasses.material_processes_misc import (
     AdhesiveApplication,
     AirKnifeGasQuenching,
@@ -117,36 +123,234 @@ def get_reference(upload_id, file_name):
     return f'../uploads/{upload_id}/archive/{entry_id}#data'
 
 
-def get_value(data, key, default=None, number=True, unit=None, factor=1.0):
-    if not isinstance(key, list):
-        key = [key]
-    if unit and not isinstance(unit, list):
-        unit = [unit]
-    if factor and not isinstance(factor, list):
-        factor = [factor] * len(key)
+@cache
+def get_unit(unit):
+    """Parse a unit string once and reuse the unit object for every cell."""
+    return ureg(unit)
 
-    try:
-        if not unit:
-            for k, f in zip(key, factor):
-                if k not in data:
-                    continue
-                if pd.isna(data[k]):
-                    return default
-                if number:
-                    return float(data[k]) * f
-                return str(data[k]).strip()
-        if unit:
-            for k, u, f in zip(key, unit, factor):
-                if k not in data:
-                    continue
-                if pd.isna(data[k]):
-                    return default
-                if number and u:
-                    Q_ = ureg.Quantity
-                    return Q_(float(data[k]) * f, ureg(u))
+
+@cache
+def compile_value_spec(key, unit=None, factor=1.0):
+    """
+    Resolve the key/unit/factor arguments of `get_value` into a hashable spec.
+
+    Args:
+        key: column name or tuple of alternative column names
+        unit: unit string or tuple of unit strings, one per column name
+        factor: scale factor or tuple of scale factors, one per column name
+
+    Returns:
+        tuple: (has_unit, ((column, unit object or None, factor), ...))
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    if unit and not isinstance(unit, tuple):
+        unit = (unit,)
+    if factor and not isinstance(factor, tuple):
+        factor = (factor,) * len(key)
+
+    if not unit:
+        return False, tuple((k, None, f) for k, f in zip(key, factor))
+    return True, tuple(
+        (k, get_unit(u) if u else None, f) for k, u, f in zip(key, unit, factor)
+    )
+
+
+def _as_hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class SheetPlan:
+    """
+    Column-index table of a batch sheet header.
+
+    The header is resolved once, every `get_value` spec is mapped onto column
+    positions the first time it is used and the rows are plain value tuples.
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.positions = {}
+        for position, column in enumerate(self.columns):
+            self.positions.setdefault(column, position)
+        self._accessors = {}
+
+    def accessor(self, spec):
+        accessor = self._accessors.get(spec)
+        if accessor is None:
+            has_unit, entries = spec
+            accessor = (
+                has_unit,
+                tuple(
+                    (self.positions[k], u, f)
+                    for k, u, f in entries
+                    if k in self.positions
+                ),
+            )
+            self._accessors[spec] = accessor
+        return accessor
+
+    def row(self, values):
+        return PlanRow(self, tuple(values))
+
+    def iterrows(self, df):
+        """Same as `DataFrame.iterrows` but yields `PlanRow` objects."""
+        for label, values in zip(df.index, df.itertuples(index=False, name=None)):
+            yield label, PlanRow(self, values)
+
+
+class PlanRow:
+    """Row of a `SheetPlan`, accepted by all `map_*` functions instead of a Series."""
+
+    __slots__ = ('plan', 'values')
+
+    def __init__(self, plan, values):
+        self.plan = plan
+        self.values = values
+
+    @property
+    def index(self):
+        return self.plan.columns
+
+    def __contains__(self, key):
+        return key in self.plan.positions
+
+    def __getitem__(self, key):
+        return self.values[self.plan.positions[key]]
+
+    def get(self, key, default=None):
+        position = self.plan.positions.get(key)
+        return default if position is None else self.values[position]
+
+
+class ColumnarSheet(SheetPlan):
+    """
+    Whole-sheet mode of a `SheetPlan`.
+
+    The missing/float/string conversions are done once per column as vectorized
+    operations on the process DataFrame, the `map_*` functions then only pick
+    the precomputed values of their row.
+    """
+
+    def __init__(self, df):
+        super().__init__(df.columns)
+        self.frame = df
+        self._missing = {}
+        self._numbers = {}
+        self._texts = {}
+        self._datetimes = {}
+
+    def missing(self, position):
+        if position not in self._missing:
+            column = self.frame.iloc[:, position]
+            self._missing[position] = column.isna().to_numpy().tolist()
+        return self._missing[position]
+
+    def numbers(self, position, factor):
+        if (position, factor) not in self._numbers:
+            column = self.frame.iloc[:, position]
+            if pd.api.types.is_datetime64_any_dtype(
+                column
+            ) or pd.api.types.is_timedelta64_dtype(column):
+                numbers = np.full(len(column), np.nan)
+            else:
+                column = pd.to_numeric(column, errors='coerce')
+                numbers = column.to_numpy(dtype=float, na_value=np.nan) * factor
+            self._numbers[(position, factor)] = numbers.tolist()
+        return self._numbers[(position, factor)]
+
+    def texts(self, position):
+        if position not in self._texts:
+            column = self.frame.iloc[:, position]
+            # str() of each value as in the row-wise mode, astype(str) formats
+            # e.g. datetimes differently
+            self._texts[position] = [str(value).strip() for value in column.tolist()]
+        return self._texts[position]
+
+    def datetimes(self, position, source):
+        if position not in self._datetimes:
+            column = self.frame.iloc[:, position]
+            self._datetimes[position] = batch_datetime_parser.parse_array(
+                column.to_numpy(dtype=object), source=source
+            )
+        return self._datetimes[position]
+
+    def iterrows(self, df=None):
+        """Same as `DataFrame.iterrows` but yields `ColumnarRow` objects."""
+        df = self.frame if df is None else df
+        rows = zip(df.index, df.itertuples(index=False, name=None))
+        for row_number, (label, values) in enumerate(rows):
+            yield label, ColumnarRow(self, values, row_number)
+
+
+class ColumnarRow(PlanRow):
+    """Row of a `ColumnarSheet`, reads the precomputed column values."""
+
+    __slots__ = ('row_number',)
+
+    def __init__(self, plan, values, row_number):
+        super().__init__(plan, values)
+        self.row_number = row_number
+
+    def number(self, position, factor):
+        value = self.plan.numbers(position, factor)[self.row_number]
+        if np.isnan(value):
+            # not parseable in bulk, let float() decide as in the row-wise mode
+            return float(self.values[position]) * factor
+        return value
+
+
+_SKIP = object()
+
+
+def _convert_value(  # noqa: PLR0913, PLR0917
+    value, default, number, has_unit, unit, factor
+):
+    if pd.isna(value):
         return default
-    except Exception as e:
-        raise e
+    if not has_unit:
+        if number:
+            return float(value) * factor
+        return str(value).strip()
+    if number and unit is not None:
+        return ureg.Quantity(float(value) * factor, unit)
+    return _SKIP
+
+
+def _get_columnar_value(data, spec, default, number):
+    sheet, row_number = data.plan, data.row_number
+    has_unit, entries = sheet.accessor(spec)
+    for position, u, f in entries:
+        if sheet.missing(position)[row_number]:
+            return default
+        if not has_unit:
+            if number:
+                return data.number(position, f)
+            return sheet.texts(position)[row_number]
+        if number and u is not None:
+            return ureg.Quantity(data.number(position, f), u)
+    return default
+
+
+def get_value(data, key, default=None, number=True, unit=None, factor=1.0):
+    spec = compile_value_spec(
+        _as_hashable(key), _as_hashable(unit), _as_hashable(factor)
+    )
+    if isinstance(data, ColumnarRow):
+        return _get_columnar_value(data, spec, default, number)
+    if isinstance(data, PlanRow):
+        has_unit, entries = data.plan.accessor(spec)
+        values = data.values
+        entries = ((values[position], u, f) for position, u, f in entries)
+    else:
+        has_unit, entries = spec
+        entries = ((data[k], u, f) for k, u, f in entries if k in data)
+
+    for value, u, f in entries:
+        result = _convert_value(value, default, number, has_unit, u, f)
+        if result is not _SKIP:
+            return result
+    return default
 
 
 def get_datetime(data, key):
@@ -161,44 +365,23 @@ def get_datetime(data, key):
         str: Formatted datetime string in NOMAD format ('%Y-%m-%d %H:%M:%S.%f')
         None: If key is missing, value is NaN, or parsing fails
     """
-    import pandas as pd
-
-    if key not in data or pd.isna(data[key]):
-        return None
-
-    date_value = str(data[key]).strip()
-
-    # List of supported date formats to try (with and without time)
-    date_formats = [
-        '%d-%m-%Y',
-        '%d/%m/%Y',
-        '%d.%m.%Y',
-        '%Y-%m-%d',  # ISO date
-        '%d-%m-%y',
-        '%d/%m/%y',
-        '%Y-%m-%d %H:%M:%S',  # ISO with time
-        '%Y-%m-%d %H:%M:%S.%f',
-        '%d-%m-%Y %H:%M:%S',
-        '%d/%m/%Y %H:%M:%S',
-        '%d.%m.%Y %H:%M:%S',
-    ]
-
-    for date_format in date_formats:
-        try:
-            dt = datetime.strptime(date_value, date_format)
-            return dt.strftime('%Y-%m-%d %H:%M:%S.%f')
-        except ValueError:
-            continue
-
-    # Try pandas as a fallback (handles many formats)
-    try:
-        dt = pd.to_datetime(date_value)
-        return dt.strftime('%Y-%m-%d %H:%M:%S.%f')
-    except Exception:
-        pass
+    if isinstance(data, ColumnarRow):
+        if key not in data:
+            return None
+        sheet, position = data.plan, data.plan.positions[key]
+        if sheet.missing(position)[data.row_number]:
+            return None
+        dt = sheet.datetimes(position, key)[data.row_number]
+    else:
+        if key not in data or pd.isna(data[key]):
+            return None
+        dt = batch_datetime_parser.parse(data[key], source=key)
+
+    if dt is not None:
+        return dt.strftime(NOMAD_DATETIME_FORMAT)
 
     print(
-        f"Warning: Could not parse date '{date_value}' with key '{key}'. Tried formats: {date_formats}"
+        f"Warning: Could not parse date '{str(data[key]).strip()}' with key '{key}'. Tried formats: {BATCH_DATE_FORMATS}"
     )
     return None
 
@@ -369,7 +552,67 @@ def map_layer(data):
     ]
 
 
+SOLUTION_PREFIXES = ('solvent', 'solute', 'additive')
+FILTRATION_COLUMNS = ('Filter Material', 'Filter Pore Size [um]')
+
+
+@lru_cache(maxsize=256)
+def get_chemical_prefixes(columns):
+    """
+    Index the `Solvent N`, `Solute N` and `Additive N` prefixes of a sheet header.
+
+    Args:
+        columns: tuple with the column names of the sheet
+
+    Returns:
+        tuple: (solvents, solutes, additives, solution_columns), the prefixes are
+            sorted and solution_columns are all columns `map_solutions` reads
+    """
+    prefixes = {prefix: set() for prefix in SOLUTION_PREFIXES}
+    solution_columns = []
+    for col in columns:
+        for prefix, found in prefixes.items():
+            if col.lower().startswith(prefix):
+                found.add(' '.join(col.split(' ')[:2]))
+                solution_columns.append(col)
+        if col in FILTRATION_COLUMNS:
+            solution_columns.append(col)
+    return (
+        *(sorted(prefixes[prefix]) for prefix in SOLUTION_PREFIXES),
+        tuple(dict.fromkeys(solution_columns)),
+    )
+
+
+def _hashable_cell(value):
+    # 1, 1.0 and True are equal keys but give the strings '1', '1.0' and 'True'
+    return None if pd.isna(value) else (type(value), str(value), value)
+
+
+@lru_cache(maxsize=1024)
+def _build_solution(solution_columns, cells):
+    values = (None if cell is None else cell[2] for cell in cells)
+    return _map_solutions(dict(zip(solution_columns, values)), solution_columns)
+
+
 def map_solutions(data):
+    """
+    Map the solution columns of a row to a `Solution`.
+
+    Rows with the same solution columns share one cached `Solution` tree,
+    every call returns a deep copy of it.
+    """
+    columns = data.index if isinstance(data, PlanRow) else tuple(data.index)
+    solution_columns = get_chemical_prefixes(columns)[3]
+    try:
+        cells = tuple(_hashable_cell(data[col]) for col in solution_columns)
+        solution = _build_solution(solution_columns, cells)
+    except TypeError:
+        # unhashable cell content, build the solution without caching
+        return _map_solutions(data, columns)
+    return solution.m_copy(deep=True)
+
+
+def _map_solutions(data, columns):
     filtration = None
 
     if get_value(data, 'Filter Material', None, False):
@@ -379,22 +622,13 @@ def map_solutions(data):
             filter_pore_size=get_value(data, 'Filter Pore Size [um]', None, unit='um'),
         )
 
-    solvents = []
-    solutes = []
-    additives = []
-    for col in data.index:
-        if col.lower().startswith('solvent'):
-            solvents.append(' '.join(col.split(' ')[:2]))
-        if col.lower().startswith('solute'):
-            solutes.append(' '.join(col.split(' ')[:2]))
-        if col.lower().startswith('additive'):
-            additives.append(' '.join(col.split(' ')[:2]))
+    solvents, solutes, additives, _ = get_chemical_prefixes(columns)
 
     final_solvents = []
     final_solutes = []
     final_additives = []
 
-    for solvent in sorted(set(solvents)):
+    for solvent in solvents:
         final_solvents.append(
             SolutionChemical(
                 chemical_2=PubChemPureSubstanceSectionCustom(
@@ -409,7 +643,7 @@ def map_solutions(data):
                 chemical_id=get_value(data, f'{solvent} chemical ID', None, False),
             ),
         )
-    for solute in sorted(set(solutes)):
+    for solute in solutes:
         final_solutes.append(
             SolutionChemical(
                 chemical_2=PubChemPureSubstanceSectionCustom(
@@ -442,7 +676,7 @@ def map_solutions(data):
                 chemical_id=get_value(data, f'{solute} chemical ID', None, False),
             ),
         )
-    for additive in sorted(set(additives)):
+    for additive in additives:
         final_additives.append(
             SolutionChemical(
                 chemical_2=PubChemPureSubstanceSectionCustom(
@@ -1880,3 +2114,28 @@ def map_generic(i, j, lab_ids, data, upload_id, generic_class):
         f'{i}_{j}_generic_process_{sanitize_filename(name, replace_spaces=True)}',
         archive,
     )
+
+
+def map_sheet(  # noqa: PLR0913, PLR0917
+    map_function, i, lab_ids, data, upload_id, process_class, **kwargs
+):
+    """
+    Map a whole process DataFrame in columnar mode.
+
+    Args:
+        map_function: one of the process mappers, e.g. `map_spin_coating`
+        i: position of the process in the experimental plan
+        lab_ids: list with the lab ids of the samples of each row of `data`
+        data: pandas DataFrame with one row per process variation
+        upload_id: upload id used for the sample references
+        process_class: section class passed on to `map_function`
+        **kwargs: further arguments of `map_function`, e.g. `coevaporation`
+
+    Returns:
+        list: (file_name, archive) tuples in row order, `j` is the row label
+    """
+    sheet = ColumnarSheet(data)
+    return [
+        map_function(i, j, row_lab_ids, row, upload_id, process_class, **kwargs)
+        for row_lab_ids, (j, row) in zip(lab_ids, sheet.iterrows())
+    ]
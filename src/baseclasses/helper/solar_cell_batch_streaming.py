@@ -0,0 +1,102 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from openpyxl import load_workbook
+
+from baseclasses.helper.solar_cell_batch_mapping import SheetPlan
+
+
+def get_sheet_plan(header):
+    # same names as pandas.read_excel gives to empty header cells
+    return SheetPlan(
+        f'Unnamed: {position}' if column is None else str(column)
+        for position, column in enumerate(header)
+    )
+
+
+def iter_sheet_rows(workbook_file, sheet_names=None, header_row=1):
+    """
+    Iterate the rows of an Excel workbook sheet by sheet in read-only mode.
+
+    Only one row is held in memory at a time, empty rows are skipped.
+
+    Args:
+        workbook_file: path or file object of the workbook
+        sheet_names: names of the sheets to read, `None` reads all sheets
+        header_row: 1-based row number of the column names
+
+    Yields:
+        tuple: (sheet index, sheet name, row index, PlanRow), the row index
+            counts the data rows below the header starting at 0
+    """
+    workbook = load_workbook(workbook_file, read_only=True, data_only=True)
+    try:
+        for sheet_index, sheet in enumerate(workbook.worksheets):
+            if sheet_names is not None and sheet.title not in sheet_names:
+                continue
+            rows = sheet.iter_rows(min_row=header_row, values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            plan = get_sheet_plan(header)
+            padding = (None,) * len(plan.columns)
+            for row_index, values in enumerate(rows):
+                if all(value is None for value in values):
+                    continue
+                row = plan.row((*values, *padding[len(values) :]))
+                yield sheet_index, sheet.title, row_index, row
+    finally:
+        workbook.close()
+
+
+def stream_batch_archives(
+    workbook_file,
+    sheet_mappers,
+    upload_id,
+    lab_id_column='Nomad ID',
+    header_row=1,
+):
+    """
+    Lazily map the process sheets of a batch plan workbook.
+
+    Args:
+        workbook_file: path or file object of the workbook
+        sheet_mappers: dict sheet name -> (map_function, process_class) or
+            (map_function, process_class, kwargs), e.g.
+            {'Spin Coating': (map_spin_coating, HySprint_SpinCoating)}
+        upload_id: upload id used for the sample references
+        lab_id_column: column with the lab id of the sample of each row
+        header_row: 1-based row number of the column names
+
+    Yields:
+        tuple: (file_name, section) as returned by the `map_*` functions, the
+            sheet index is used as position in the experimental plan
+    """
+    rows = iter_sheet_rows(workbook_file, list(sheet_mappers), header_row)
+    for sheet_index, sheet_name, row_index, row in rows:
+        map_function, process_class, *kwargs = sheet_mappers[sheet_name]
+        lab_id = row.get(lab_id_column)
+        yield map_function(
+            sheet_index,
+            row_index,
+            [str(lab_id)] if lab_id is not None else [],
+            row,
+            upload_id,
+            process_class,
+            **(kwargs[0] if kwargs else {}),
+        )
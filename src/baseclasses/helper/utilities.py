@@ -16,9 +16,13 @@
 # limitations under the License.
 #
 
+import hashlib
 import json
 import random
 import string
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 import chardet
@@ -55,6 +59,13 @@ def traverse_dictionary(entry_dict, key, value):
             entry_dict[k] = value
 
 
+def set_by_key_path(data, keys_list, value):
+    tmp = data
+    for key in keys_list[:-1]:
+        tmp = tmp[key]
+    tmp[keys_list[-1]] = value
+
+
 def rewrite_json_recursively(archive, key, value):
     with archive.m_context.raw_file(archive.metadata.mainfile) as f:
         file = f.name
@@ -72,15 +83,53 @@ def rewrite_json(keys_list, archive, value):
 
     with open(file) as jsonFile:
         data = json.load(jsonFile)
-    tmp = data
-    for key in keys_list[:-1]:
-        tmp = tmp[key]
-    tmp[keys_list[-1]] = value
+    set_by_key_path(data, keys_list, value)
 
     with open(file, 'w') as jsonFile:
         json.dump(data, jsonFile)
 
 
+class JsonPatchBuffer:
+    """
+    Collects rewrites of the mainfile json of an archive and applies them with
+    a single read/modify/write, either by calling `apply` or when leaving the
+    `with` block. The rewrites are applied in the order they were added.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.patches = []
+
+    def rewrite_json(self, keys_list, value):
+        self.patches.append((list(keys_list), None, value))
+
+    def rewrite_json_recursively(self, key, value):
+        self.patches.append((None, key, value))
+
+    def apply(self):
+        if not self.patches:
+            return
+        with self.archive.m_context.raw_file(self.archive.metadata.mainfile) as f:
+            file = f.name
+
+        with open(file) as jsonFile:
+            data = json.load(jsonFile)
+        for keys_list, key, value in self.patches:
+            if keys_list is None:
+                traverse_dictionary(data, key, value)
+            else:
+                set_by_key_path(data, keys_list, value)
+        with open(file, 'w') as jsonFile:
+            json.dump(data, jsonFile)
+        self.patches = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.apply()
+
+
 def get_parameter(parameters, dictionary, tuple_index=None):
     tmp_dict = dictionary
     try:
@@ -301,24 +350,197 @@ def create_archive(entity, archive, file_name, overwrite=False):
         with archive.m_context.raw_file(file_name, 'w') as outfile:
             json.dump({'data': entity_entry}, outfile)
         archive.m_context.process_updated_raw_file(file_name, allow_modify=overwrite)
+        invalidate_lab_id(archive, getattr(entity, 'lab_id', None))
         return True
     return False
 
 
+class BulkArchiveWriter:
+    """
+    Stages archives and writes them in one pass, the context is only notified
+    afterwards, in one deferred reprocessing stage for all written files.
+
+    The entities are serialized when they are added, later changes to an added
+    entity are not written. The durations of the write and the reprocessing
+    stage are stored in `write_time` and `process_time` (seconds).
+
+    With a `manifest_file` the content hash of every written archive is stored
+    in that raw file. Archives whose content did not change since the last
+    write, and whose file was not edited since, are skipped and not
+    reprocessed.
+    """
+
+    def __init__(self, archive, logger=None, manifest_file=None):
+        self.archive = archive
+        self.logger = logger
+        self.manifest_file = manifest_file
+        self.staged = {}
+        self.skipped = []
+        self.write_time = None
+        self.process_time = None
+
+    def add(self, entity, file_name, overwrite=False):
+        """Same as `create_archive`, but the file is only staged."""
+        if self.archive.m_context.raw_path_exists(file_name) and not overwrite:
+            return False
+        content = json.dumps({'data': entity.m_to_dict(with_root_def=True)})
+        self.staged[file_name] = (content, overwrite, getattr(entity, 'lab_id', None))
+        return True
+
+    def read_manifest(self):
+        if not self.manifest_file or not self.archive.m_context.raw_path_exists(
+            self.manifest_file
+        ):
+            return {}
+        with self.archive.m_context.raw_file(self.manifest_file) as f:
+            return json.load(f)
+
+    def file_hash(self, file_name):
+        """Content hash of the raw file, None if it does not exist."""
+        if not self.archive.m_context.raw_path_exists(file_name):
+            return None
+        with self.archive.m_context.raw_file(file_name) as f:
+            return hashlib.sha256(f.read().encode()).hexdigest()
+
+    def write(self):
+        start = time.perf_counter()
+        staged, self.staged = self.staged, {}
+        manifest = self.read_manifest()
+        written, self.skipped = [], []
+        for file_name, (content, overwrite, lab_id) in staged.items():
+            content_hash = hashlib.sha256(content.encode()).hexdigest()
+            # the manifest is a fast pre-check, the file may have been edited
+            if manifest.get(file_name) == content_hash and (
+                self.file_hash(file_name) == content_hash
+            ):
+                self.skipped.append(file_name)
+                continue
+            with self.archive.m_context.raw_file(file_name, 'w') as outfile:
+                outfile.write(content)
+            manifest[file_name] = content_hash
+            written.append((file_name, overwrite, lab_id))
+        if self.manifest_file and written:
+            with self.archive.m_context.raw_file(self.manifest_file, 'w') as outfile:
+                json.dump(manifest, outfile, indent=2)
+        self.write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for file_name, overwrite, lab_id in written:
+            self.archive.m_context.process_updated_raw_file(
+                file_name, allow_modify=overwrite
+            )
+            invalidate_lab_id(self.archive, lab_id)
+        self.process_time = time.perf_counter() - start
+
+        if self.logger:
+            self.logger.info(
+                f'Wrote {len(written)} archives in {self.write_time:.2f} s '
+                f'({len(self.skipped)} unchanged), '
+                f'reprocessing took {self.process_time:.2f} s'
+            )
+        return [file_name for file_name, *_ in written]
+
+
 def get_reference(upload_id, entry_id):
     return f'../uploads/{upload_id}/archive/{entry_id}#data'
 
 
-def search_entry_by_id(archive, entry, search_id):
+class LabIdSearchCache:
+    """
+    Bounded LRU cache with a time to live for lab id searches.
+
+    The entries are keyed by (user_id, lab_id, upload_id), `hits` and `misses`
+    count the lookups. Use `get_lab_id_search_cache` to get the cache of the
+    upload that is processed.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, lab_id=None):
+        """Drop all entries of a lab id, or all entries if no lab id is given."""
+        with self._lock:
+            if lab_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1] == lab_id]:
+                del self._entries[key]
+
+
+def get_lab_id_search_cache(archive):
+    """
+    Returns the lab id search cache of the context of the archive. The
+    context lives as long as its upload is processed, so the cache is not
+    shared across uploads, users or workers. None without a context.
+    """
+    context = archive.m_context
+    if context is None:
+        return None
+    cache = getattr(context, 'lab_id_search_cache', None)
+    if cache is None:
+        cache = LabIdSearchCache()
+        context.lab_id_search_cache = cache
+    return cache
+
+
+def invalidate_lab_id(archive, lab_id):
+    # a newly written and processed sample has to be found by the following
+    # searches
+    cache = get_lab_id_search_cache(archive)
+    if lab_id and cache is not None:
+        cache.invalidate(lab_id)
+
+
+def search_lab_id(archive, lab_id, upload_id=None):
+    """
+    Searches the entries with the lab id. Searches that found entries are
+    cached in the cache of the processed upload, empty results are not.
+    """
     from nomad.search import search
 
-    query = {'results.eln.lab_ids': search_id}
-    search_result = search(
-        owner='all', query=query, user_id=archive.metadata.main_author.user_id
-    )
+    user_id = archive.metadata.main_author.user_id
+    key = (user_id, lab_id, upload_id)
+    cache = get_lab_id_search_cache(archive)
+    search_result = cache.get(key) if cache is not None else None
+    if search_result is not None:
+        return search_result
+
+    query = {'results.eln.lab_ids': lab_id}
+    if upload_id is not None:
+        query['upload_id'] = upload_id
+    search_result = search(owner='all', query=query, user_id=user_id)
+    if cache is not None and search_result.data:
+        cache.put(key, search_result)
     return search_result
 
 
+def search_entry_by_id(archive, entry, search_id):
+    return search_lab_id(archive, search_id)
+
+
 def log_error(class_obj, logger, msg):
     if logger:
         logger.error(msg, normalizer=class_obj.__class__.__name__, section='system')
@@ -327,16 +549,103 @@ def log_error(class_obj, logger, msg):
 
 
 def search_sampleid_in_upload(archive, sample_id, upload_id):
+    return search_lab_id(archive, sample_id, upload_id)
+
+
+SAMPLE_REFERENCE_ENTRY_TYPES = (
+    'sample',
+    'library',
+    'solution',
+    'ink',
+    'environment',
+    'setup',
+    'electrolyser',
+)
+
+
+def is_sample_reference_type(entry_type):
+    entry_type = entry_type.lower()
+    return any(name in entry_type for name in SAMPLE_REFERENCE_ENTRY_TYPES)
+
+
+def resolve_lab_ids(archive, lab_ids, upload_id=None, page_size=1000):
+    """
+    Resolve many lab ids with one paginated search.
+
+    Like `set_sample_reference`, a lab id is only resolved if exactly one
+    entry has it and the entry is a sample, library, solution, ink,
+    environment, setup or electrolyser.
+
+    Args:
+        archive: archive of the entry that searches, provides the user
+        lab_ids: iterable of lab ids
+        upload_id: only search in this upload
+        page_size: number of entries fetched per request
+
+    Returns:
+        dict: lab_id -> (upload_id, entry_id, entry_type)
+    """
+    from nomad.app.v1.models import MetadataPagination, MetadataRequired
     from nomad.search import search
 
-    query = {'results.eln.lab_ids': sample_id, 'upload_id': upload_id}
-    search_result = search(
-        owner='all', query=query, user_id=archive.metadata.main_author.user_id
+    lab_ids = list(dict.fromkeys(lab_id for lab_id in lab_ids if lab_id))
+    if not lab_ids:
+        return {}
+
+    query = {'results.eln.lab_ids:any': lab_ids}
+    if upload_id is not None:
+        query['upload_id'] = upload_id
+    required = MetadataRequired(
+        include=['entry_id', 'upload_id', 'entry_type', 'results.eln.lab_ids']
     )
-    return search_result
+    requested = set(lab_ids)
+    hits = {}
+    page_after_value = None
+    while True:
+        pagination = MetadataPagination()
+        pagination.page_size = page_size
+        pagination.page_after_value = page_after_value
+        search_result = search(
+            owner='all',
+            query=query,
+            pagination=pagination,
+            required=required,
+            user_id=archive.metadata.main_author.user_id,
+        )
+        for data in search_result.data:
+            entry_lab_ids = data.get('results', {}).get('eln', {}).get('lab_ids', [])
+            for lab_id in requested.intersection(entry_lab_ids):
+                hits.setdefault(lab_id, []).append(
+                    (data['upload_id'], data['entry_id'], data['entry_type'])
+                )
+        page_after_value = search_result.pagination.next_page_after_value
+        if not search_result.data or page_after_value is None:
+            break
+
+    return {
+        lab_id: entries[0]
+        for lab_id, entries in hits.items()
+        if len(entries) == 1 and is_sample_reference_type(entries[0][2])
+    }
 
 
-def set_sample_reference(archive, entry, search_id, upload_id=None):
+def set_sample_reference(
+    archive, entry, search_id, upload_id=None, resolved_lab_ids=None
+):
+    """
+    Reference the sample with the lab id `search_id` in `entry.samples`.
+
+    Pass the result of `resolve_lab_ids` as `resolved_lab_ids` to avoid a
+    search per entry.
+    """
+    if resolved_lab_ids is not None:
+        resolved = resolved_lab_ids.get(search_id)
+        if resolved is not None:
+            entry.samples = [
+                CompositeSystemReference(reference=get_reference(*resolved[:2]))
+            ]
+        return
+
     if upload_id is None:
         search_result = search_entry_by_id(archive, entry, search_id)
     else:
@@ -344,52 +653,19 @@ def set_sample_reference(archive, entry, search_id, upload_id=None):
     if len(search_result.data) == 1:
         data = search_result.data[0]
         upload_id, entry_id = data['upload_id'], data['entry_id']
-        if (
-            'sample' in data['entry_type'].lower()
-            or 'library' in data['entry_type'].lower()
-        ):
-            entry.samples = [
-                CompositeSystemReference(reference=get_reference(upload_id, entry_id))
-            ]
-        if (
-            'solution' in data['entry_type'].lower()
-            or 'ink' in data['entry_type'].lower()
-        ):
-            entry.samples = [
-                CompositeSystemReference(reference=get_reference(upload_id, entry_id))
-            ]
-        if (
-            'environment' in data['entry_type'].lower()
-            or 'setup' in data['entry_type'].lower()
-        ):
-            entry.samples = [
-                CompositeSystemReference(reference=get_reference(upload_id, entry_id))
-            ]
-        if 'electrolyser' in data['entry_type'].lower():
+        if is_sample_reference_type(data['entry_type']):
             entry.samples = [
                 CompositeSystemReference(reference=get_reference(upload_id, entry_id))
             ]
 
 
 def create_short_id(archive, lab_id_base, entry_type):
-    from nomad.app.v1.models import MetadataPagination
-    from nomad.search import search
-
-    query = {'entry_type': entry_type, 'results.eln.lab_ids': lab_id_base}
-    pagination = MetadataPagination()
-    pagination.page_size = 9999
-    search_result = search(
-        owner='all',
-        query=query,
-        pagination=pagination,
-        user_id=archive.metadata.main_author.user_id,
-    )
-    from nomad_chemical_energy.schema_packages.hzb_catlab_package import (
-        get_next_project_sample_number,
+    from baseclasses.helper.project_sample_numbers import (
+        reserve_project_sample_number,
     )
 
-    project_sample_number = get_next_project_sample_number(
-        search_result.data, archive.metadata.entry_id
+    project_sample_number = reserve_project_sample_number(
+        archive, lab_id_base, separator='', entry_type=entry_type
     )
 
     return f'{lab_id_base}{project_sample_number:04d}'
@@ -404,16 +680,10 @@ def get_entry_reference(archive, entry, search_id):
 
 
 def find_sample_by_id(archive, sample_id):
-    from nomad.search import search
-
     if sample_id is None:
         return None
 
-    query = {'results.eln.lab_ids': sample_id}
-
-    search_result = search(
-        owner='all', query=query, user_id=archive.metadata.main_author.user_id
-    )
+    search_result = search_lab_id(archive, sample_id)
     if len(search_result.data) > 0:
         entry_id = search_result.data[0]['entry_id']
         upload_id = search_result.data[0]['upload_id']
@@ -433,34 +703,70 @@ def search_class(archive, entry_type):
 
 
 def get_processes(archive, entry_id):
-    from nomad import files
-    from nomad.app.v1.models import MetadataPagination
-    from nomad.search import search
+    return get_processes_of_samples(archive, [entry_id])[entry_id]
 
-    # search for all archives referencing this archive
-    query = {
-        'entry_references.target_entry_id': entry_id,
-    }
-    pagination = MetadataPagination()
-    pagination.page_size = 100
-    search_result = search(
-        owner='all',
-        query=query,
-        pagination=pagination,
-        user_id=archive.metadata.main_author.user_id,
+
+def get_processes_of_samples(archive, entry_ids, page_size=1000):
+    """
+    Find the processes referencing any of the samples with one paginated
+    search and group them by sample.
+
+    Returns:
+        dict: entry_id -> list of (positon_in_experimental_plan, name) sorted
+            by the position
+    """
+    from baseclasses.helper.entry_projection import iter_projected
+
+    processes = {entry_id: [] for entry_id in entry_ids}
+    query = {'entry_references.target_entry_id:any': list(processes)}
+    hits = iter_projected(
+        archive,
+        query,
+        include=[
+            'data.positon_in_experimental_plan',
+            'data.name',
+            'entry_references.target_entry_id',
+        ],
+        required=['data.m_def'],
+        page_size=page_size,
     )
-    processes = []
-    for res in search_result.data:
-        with files.UploadFiles.get(upload_id=res['upload_id']).read_archive(
-            entry_id=res['entry_id']
-        ) as arch:
-            entry_id = res['entry_id']
-            entry_data = arch[entry_id]['data']
-            if 'positon_in_experimental_plan' in entry_data:
-                processes.append(
-                    (
-                        entry_data.get('positon_in_experimental_plan'),
-                        entry_data.get('name'),
-                    )
-                )
-    return sorted(processes, key=lambda pair: pair[0])
+    for res in hits:
+        entry_data = res.get('data', {})
+        if 'positon_in_experimental_plan' not in entry_data:
+            continue
+        process = (
+            entry_data.get('positon_in_experimental_plan'),
+            entry_data.get('name'),
+        )
+        targets = {
+            reference.get('target_entry_id')
+            for reference in res.get('entry_references', [])
+        }
+        for entry_id in targets.intersection(processes):
+            processes[entry_id].append(process)
+
+    for sample_processes in processes.values():
+        sample_processes.sort(key=lambda pair: pair[0])
+    return processes
+
+
+def write_process_table(outfile, rows, width=None):
+    """
+    Write rows of (sample id, process names) as csv in the layout of
+    `pandas.DataFrame(rows).to_csv`, one row at a time.
+
+    Args:
+        outfile: text file
+        rows: iterable of (sample_id, process names)
+        width: number of columns, required to stream `rows` from a generator
+    """
+    import csv
+
+    if width is None:
+        rows = list(rows)
+        width = max((1 + len(names) for _, names in rows), default=0)
+    writer = csv.writer(outfile, lineterminator='\n')
+    writer.writerow(['', *range(width)])
+    for index, (sample_id, names) in enumerate(rows):
+        padding = [''] * (width - 1 - len(names))
+        writer.writerow([index, sample_id, *names, *padding])
@@ -16,7 +16,7 @@
 # limitations under the License.
 #
 
-import os
+from functools import cached_property
 
 import numpy as np
 import pandas as pd
@@ -27,6 +27,7 @@ from scipy import integrate, optimize
 from scipy.signal import savgol_filter
 
 from .. import BaseMeasurement
+from .reference_spectrum import get_am15g_spectrum
 
 # Constants
 temperature = 300  # in [°K]
@@ -57,30 +58,19 @@ def select_range(array, value_start, value_end):
     return idx_start, idx_end
 
 
-def fit_urbach_tail(photon_energy, intensity, fit_window=0.06, filter_window=20):
-    """
-    Fits the Urbach tail to the EQE data. To select the fitting range,
-    finds the maximun of the derivative of the log(eqe) data. Then selects the range
-    by going down a factor of 8 in eqe values from this reference point and up a factor
-    of 2.
-    This is unfortunately only a quick fix, but it works well enough based a few
-    empirical tests
-    with eqe data of perovskite solar cells.
+def smooth_eqe(intensity):
+    """Applies the Savitzky-Golay filter the Urbach tail fit uses."""
+    return savgol_filter(intensity, 51, 4, mode='mirror')
 
-    Returns:
-        urbach_e: urnach energy in eV
-        m:
-        fit_min: photon energy of the minimum of the fitted range
-        fit_max: photon energy of the maximum of the fitted range
-    """
 
-    intensity = savgol_filter(
-        intensity, 51, 4, mode='mirror'
-    )  # apply Savitzky-Golay filter to smooth the data
-    data = pd.DataFrame({'y': intensity})
+def find_inflection_point(smoothed_intensity, filter_window=20):
+    """
+    Returns the index of the maximum of the derivative of the rolling mean of
+    the log of the smoothed eqe.
+    """
+    data = pd.DataFrame({'y': smoothed_intensity})
     log_data = data.apply(np.log)
-    # find inflection point
-    infl_point = (
+    return (
         log_data.rolling(
             window=filter_window, min_periods=int(filter_window / 4), center=True
         )
@@ -88,6 +78,13 @@ def fit_urbach_tail(photon_energy, intensity, fit_window=0.06, filter_window=20)
         .diff()
         .idxmax()
     )
+
+
+def fit_smoothed_urbach_tail(photon_energy, intensity, infl_point):
+    """
+    Fits the Urbach tail to the smoothed eqe around the inflection point, see
+    `fit_urbach_tail`.
+    """
     min_eqe_fit = find_nearest(intensity, intensity[infl_point] / 8)
     max_eqe_fit = find_nearest(intensity, intensity[infl_point] * 2)
     start, stop = select_range(intensity, min_eqe_fit, max_eqe_fit)
@@ -113,17 +110,44 @@ def fit_urbach_tail(photon_energy, intensity, fit_window=0.06, filter_window=20)
     return urbach_e, m, fit_min, fit_max, urbach_e_std, fit_data
 
 
-def extrapolate_eqe(photon_energy, intensity):
+def fit_urbach_tail(photon_energy, intensity, fit_window=0.06, filter_window=20):
+    """
+    Fits the Urbach tail to the EQE data. To select the fitting range,
+    finds the maximun of the derivative of the log(eqe) data. Then selects the range
+    by going down a factor of 8 in eqe values from this reference point and up a factor
+    of 2.
+    This is unfortunately only a quick fix, but it works well enough based a few
+    empirical tests
+    with eqe data of perovskite solar cells.
+
+    Returns:
+        urbach_e: urnach energy in eV
+        m:
+        fit_min: photon energy of the minimum of the fitted range
+        fit_max: photon energy of the maximum of the fitted range
+    """
+
+    intensity = smooth_eqe(intensity)  # apply Savitzky-Golay filter to smooth the data
+    infl_point = find_inflection_point(intensity, filter_window)
+    return fit_smoothed_urbach_tail(photon_energy, intensity, infl_point)
+
+
+def extrapolate_eqe(photon_energy, intensity, urbach_fit=None):
     """
     Extrapolates the EQE data with the fitted Urbach tail.
 
+    Args:
+        urbach_fit: result of `fit_urbach_tail`, fitted if not given
+
     Returns:
         photon_energy_extrapolated: array of the extrapolated photon energy values in
         eV
         eqe_extrapolated: array of the extrapolated eqe values
     """
     try:
-        urbach_e, *_, fit_data = fit_urbach_tail(photon_energy, intensity)
+        if urbach_fit is None:
+            urbach_fit = fit_urbach_tail(photon_energy, intensity)
+        urbach_e, *_, fit_data = urbach_fit
         min_eqe_fit = fit_data.get('min_eqe_fit')
         x_extrap = (
             np.linspace(-1, 0, 500, endpoint=False)
@@ -159,12 +183,7 @@ def calculate_jsc(photon_energy, intensity):
     Returns:
         jsc: short circuit current density in A m**(-2)
     """
-    dir_path = os.path.dirname(os.path.realpath(__file__))
-    filename2 = os.path.join(dir_path, 'AM15G.dat.txt')
-    df_am15 = pd.read_csv(filename2, header=None)
-    energy_AM15 = np.array(df_am15[df_am15.columns[1]])
-    spectrum_AM15 = np.array(df_am15[df_am15.columns[2]])
-    spectrum_AM15G_interp = np.interp(photon_energy, energy_AM15, spectrum_AM15)
+    spectrum_AM15G_interp = get_am15g_spectrum().interpolate(photon_energy)
     jsc_calc = integrate.cumulative_trapezoid(
         intensity * spectrum_AM15G_interp, photon_energy
     )
@@ -189,6 +208,22 @@ def calculate_bandgap(photon_energy, intensity):
     return bandgap
 
 
+def calculate_radiative_emission(photon_energy, intensity):
+    """
+    Calculates the j0rad and the EL spectrum of an (extrapolated) eqe.
+
+    Returns:
+        j0rad: radiative saturation current density in A m**(-2)
+        EL: EL spectrum
+    """
+    x, y = photon_energy, intensity
+    phi_BB = (2 * np.pi * q**3 * (x) ** 2) / (h_Js**3 * c**2 * (np.exp(x / VT) - 1))
+    el = phi_BB * y
+    j0rad = integrate.trapezoid(el, x)
+    j0rad = j0rad * q
+    return j0rad, el
+
+
 def calculate_j0rad(photon_energy, intensity):
     """
     Calculates the radiative saturation current (j0rad) and the calculated
@@ -199,19 +234,9 @@ def calculate_j0rad(photon_energy, intensity):
         j0rad: radiative saturation current density in A m**(-2)
         EL: EL spectrum
     """
+    analysis = EQEAnalysis(photon_energy, intensity)
     try:
-        urbach_e = fit_urbach_tail(photon_energy, intensity)[0]
-        # try to calculate the j0rad and EL spectrum except if the urbach energy is
-        # larger than 0.026
-        if urbach_e >= 0.026 or urbach_e <= 0.0:
-            raise ValueError("""Urbach energy is > 0.026 eV (~kB*T for T = 300K), or
-            it could notbe estimated. The `j0rad` could not be calculated.""")
-
-        x, y = extrapolate_eqe(photon_energy, intensity)
-        phi_BB = (2 * np.pi * q**3 * (x) ** 2) / (h_Js**3 * c**2 * (np.exp(x / VT) - 1))
-        el = phi_BB * y
-        j0rad = np.trapz(el, x)
-        j0rad = j0rad * q
+        j0rad, el = analysis.j0rad, analysis.el
     except ValueError:
         raise ValueError("""Failed to estimate a reasonable Urbach Energy.""")
     # print('Radiative saturation current: ' + str(j0rad) + ' A / m^2')
@@ -227,9 +252,7 @@ def calculate_voc_rad(photon_energy, intensity):
         voc_rad: radiative open circuit voltage in V
     """
     try:
-        j0rad = calculate_j0rad(photon_energy, intensity)[0]
-        jsc = calculate_jsc(photon_energy, intensity)
-        voc_rad = VT * np.log(jsc / j0rad)
+        voc_rad = EQEAnalysis(photon_energy, intensity).voc_rad
         # print('Voc rad: ' + str(voc_rad) + ' V')
     except ValueError:
         raise ValueError("""Urbach energy is > 0.026 eV (~kB*T for T = 300K).
@@ -237,6 +260,83 @@ def calculate_voc_rad(photon_energy, intensity):
     return voc_rad
 
 
+class EQEAnalysis:
+    """
+    Figures of merit of one eqe spectrum.
+
+    The smoothed eqe, its inflection point, the Urbach tail fit and the
+    extrapolated eqe are computed once, when they are first needed, and are
+    shared by all figures of merit. The results are the ones of the
+    `calculate_*` functions.
+    """
+
+    def __init__(self, photon_energy, intensity):
+        self.photon_energy = photon_energy
+        self.intensity = intensity
+
+    @cached_property
+    def smoothed_intensity(self):
+        return smooth_eqe(self.intensity)
+
+    @cached_property
+    def inflection_point(self):
+        return find_inflection_point(self.smoothed_intensity)
+
+    @cached_property
+    def urbach_fit(self):
+        """Result of `fit_urbach_tail`."""
+        return fit_smoothed_urbach_tail(
+            self.photon_energy, self.smoothed_intensity, self.inflection_point
+        )
+
+    @cached_property
+    def extrapolated(self):
+        """Photon energies and eqe extrapolated with the Urbach tail."""
+        return extrapolate_eqe(self.photon_energy, self.intensity, self.urbach_fit)
+
+    @cached_property
+    def bandgap(self):
+        return calculate_bandgap(self.photon_energy, self.intensity)
+
+    @cached_property
+    def jsc(self):
+        return calculate_jsc(self.photon_energy, self.intensity)
+
+    @cached_property
+    def radiative_emission(self):
+        """
+        j0rad and EL spectrum, raises a ValueError if the Urbach energy is
+        not in (0, 0.026) eV.
+        """
+        urbach_e = self.urbach_fit[0]
+        # try to calculate the j0rad and EL spectrum except if the urbach energy is
+        # larger than 0.026
+        if urbach_e >= 0.026 or urbach_e <= 0.0:
+            raise ValueError("""Urbach energy is > 0.026 eV (~kB*T for T = 300K), or
+            it could notbe estimated. The `j0rad` could not be calculated.""")
+        return calculate_radiative_emission(*self.extrapolated)
+
+    @property
+    def j0rad(self):
+        return self.radiative_emission[0]
+
+    @property
+    def el(self):
+        return self.radiative_emission[1]
+
+    @property
+    def voc_rad(self):
+        return VT * np.log(self.jsc / self.j0rad)
+
+    @property
+    def urbach_energy(self):
+        return self.urbach_fit[0]
+
+    @property
+    def urbach_energy_std(self):
+        return self.urbach_fit[4]
+
+
 class SolarCellEQE(PlotSection):
     m_def = Section(
         a_eln=dict(lane_width='600px'),
@@ -445,25 +545,17 @@ class SolarCellEQECustom(SolarCellEQE):
     def normalize(self, archive, logger):
         if self.photon_energy_array is not None and self.eqe_array is not None:
             photon_energy_array = np.array(self.photon_energy_array)
+            analysis = EQEAnalysis(photon_energy_array, self.eqe_array)
             try:
-                self.bandgap_eqe = calculate_bandgap(
-                    photon_energy_array, self.eqe_array
-                )
-                self.integrated_jsc = calculate_jsc(
-                    photon_energy_array, self.eqe_array
-                ) * ureg('A/m**2')
+                self.bandgap_eqe = analysis.bandgap
+                self.integrated_jsc = analysis.jsc * ureg('A/m**2')
                 try:
-                    self.integrated_j0rad = calculate_j0rad(
-                        photon_energy_array, self.eqe_array
-                    )[0] * ureg('A/m**2')
-                    self.voc_rad = calculate_voc_rad(
-                        photon_energy_array, self.eqe_array
-                    )
+                    self.integrated_j0rad = analysis.j0rad * ureg('A/m**2')
+                    self.voc_rad = analysis.voc_rad
                 except ValueError:
                     print('Urbach energy is > 0.026 eV (~kB*T for T = 300K).\n')
-                urbach_enery, *_, urbach_energy_fit_std_dev, _ = fit_urbach_tail(
-                    photon_energy_array, self.eqe_array
-                )
+                urbach_enery = analysis.urbach_energy
+                urbach_energy_fit_std_dev = analysis.urbach_energy_std
                 if urbach_enery <= 0.0 or urbach_enery >= 0.5:
                     print('Failed to estimate a reasonable Urbach Energy')
                 else:
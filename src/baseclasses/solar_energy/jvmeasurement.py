@@ -23,6 +23,147 @@ from nomad.metainfo import Quantity, Section, SubSection
 from .. import BaseMeasurement
 from ..helper.add_solar_cell import add_solar_cell
 
+JV_PARAMETERS = (
+    'open_circuit_voltage',
+    'short_circuit_current_density',
+    'fill_factor',
+    'efficiency',
+    'potential_at_maximum_power_point',
+    'current_density_at_maximum_power_point',
+)
+
+
+def stack_jv_curves(curves):
+    """
+    Concatenates J-V curves for `calculate_jv_parameters`.
+
+    Args:
+        curves: iterable of (voltage, current_density) arrays
+
+    Returns:
+        voltage, current_density, offsets: curve i is
+            `voltage[offsets[i]:offsets[i + 1]]`
+    """
+    voltages, current_densities = [], []
+    for voltage, current_density in curves:
+        if len(voltage) != len(current_density):
+            raise ValueError('voltage and current density differ in length')
+        voltages.append(np.asarray(voltage, dtype=np.float64))
+        current_densities.append(np.asarray(current_density, dtype=np.float64))
+    offsets = np.zeros(len(voltages) + 1, dtype=np.intp)
+    np.cumsum([len(voltage) for voltage in voltages], out=offsets[1:])
+    if not voltages:
+        return np.zeros(0), np.zeros(0), offsets
+    return np.concatenate(voltages), np.concatenate(current_densities), offsets
+
+
+def _first_index(mask, offsets):
+    """Index of the first True of every curve, len(mask) if there is none."""
+    positions = np.where(mask, np.arange(len(mask)), len(mask))
+    return np.minimum.reduceat(positions, offsets[:-1])
+
+
+def _last_index(mask, offsets):
+    """Index of the last True of every curve, -1 if there is none."""
+    positions = np.where(mask, np.arange(len(mask)), -1)
+    return np.maximum.reduceat(positions, offsets[:-1])
+
+
+def _interpolate_at_zero(x, y, offsets):
+    """
+    Interpolates y at x = 0 for every curve like `scipy.interpolate.interp1d`.
+
+    interp1d sorts the points by x (stable) and calls `np.interp`, which
+    interpolates between the last point with x <= 0 and the next one. These
+    are the last point with the largest non-positive x and the first point
+    with the smallest positive x, so the curves do not have to be sorted.
+    Curves which do not contain x = 0 are nan.
+    """
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    non_positive = x <= 0
+    maximum_non_positive = np.maximum.reduceat(
+        np.where(non_positive, x, -np.inf), starts
+    )
+    minimum_positive = np.minimum.reduceat(np.where(non_positive, np.inf, x), starts)
+    lo = _last_index(
+        non_positive & (x == np.repeat(maximum_non_positive, lengths)), offsets
+    )
+    hi = _first_index(
+        ~non_positive & (x == np.repeat(minimum_positive, lengths)), offsets
+    )
+    in_range = (np.minimum.reduceat(x, starts) <= 0) & (
+        np.maximum.reduceat(x, starts) >= 0
+    )
+    interpolated = in_range & (maximum_non_positive < 0)
+    lo = np.where(in_range, lo, starts)
+    hi = np.where(interpolated, hi, lo)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (y[hi] - y[lo]) / (x[hi] - x[lo])
+        value = slope * (0 - x[lo]) + y[lo]
+        # the fallbacks of np.interp for a non-finite slope
+        value = np.where(np.isnan(value), slope * (0 - x[hi]) + y[hi], value)
+    value = np.where(np.isnan(value) & (y[lo] == y[hi]), y[lo], value)
+    value = np.where(interpolated, value, y[lo])
+    return np.where(in_range, value, np.nan)
+
+
+def _first_argmax(values, offsets):
+    """`np.argmax` of every curve, a nan is the maximum like in np.argmax."""
+    maximum = np.repeat(np.maximum.reduceat(values, offsets[:-1]), np.diff(offsets))
+    is_maximum = (values == maximum) | (np.isnan(values) & np.isnan(maximum))
+    return _first_index(is_maximum, offsets)
+
+
+def calculate_jv_parameters(voltage, current_density, offsets):
+    """
+    Calculates the solar cell parameters of many current density (mA/cm**2)
+    voltage (V) curves at once, with the results of
+    `SolarCellJVCurve.cell_params`.
+
+    Args:
+        voltage, current_density, offsets: curves, see `stack_jv_curves`
+
+    Returns:
+        dict: arrays with one value per curve for every name in
+            `JV_PARAMETERS`, Voc (V), Jsc (mA/cm**2), FF (0-1), efficiency
+            (0-100), Vmpp (V) and Jmpp (mA/cm**2). Curves with less than two
+            points or without a crossing of J = 0 or V = 0 are nan.
+    """
+    voltage = np.asarray(voltage, dtype=np.float64)
+    current_density = np.asarray(current_density, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    lengths = np.diff(offsets)
+    parameters = {name: np.full(len(lengths), np.nan) for name in JV_PARAMETERS}
+
+    valid = lengths >= 2
+    if not valid.any():
+        return parameters
+    if not valid.all():
+        selected = np.repeat(valid, lengths)
+        voltage, current_density = voltage[selected], current_density[selected]
+        offsets = np.zeros(valid.sum() + 1, dtype=np.intp)
+        np.cumsum(lengths[valid], out=offsets[1:])
+
+    Voc = _interpolate_at_zero(current_density, voltage, offsets)
+    Isc = _interpolate_at_zero(voltage, current_density, offsets)
+    power = voltage * current_density
+    sign = np.repeat(np.where(Isc >= 0, 1.0, -1.0), np.diff(offsets))
+    idx = _first_argmax(sign * power, offsets)
+    Vmp = voltage[idx]
+    Imp = current_density[idx]
+    missing = np.isnan(Voc) | np.isnan(Isc)
+    Isc = np.abs(Isc)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        FF = np.abs(Vmp * Imp / (Voc * Isc))
+        efficiency = Voc * FF * Isc
+
+    for name, values in zip(
+        JV_PARAMETERS, (Voc, Isc, FF, efficiency, Vmp, np.abs(Imp))
+    ):
+        parameters[name][valid] = np.where(missing, np.nan, values)
+    return parameters
+
 
 class SolarCellJV(PlotSection):
     m_def = Section(
@@ -263,23 +404,41 @@ class SolarCellJVCurve(SolarCellJV):
             FF fill factor in absolute values (0-1)
             efficiency power conversion efficiency in percentage (0-100)
         """
-        from scipy import interpolate
-
-        j_v_interpolated = interpolate.interp1d(self.current_density, self.voltage)
-        Voc = j_v_interpolated(0).item()
-        v_j_interpolated = interpolate.interp1d(self.voltage, self.current_density)
-        Isc = v_j_interpolated(0).item()
-        if Isc >= 0:
-            idx = np.argmax(self.voltage * self.current_density)
-        else:
-            idx = np.argmin(self.voltage * self.current_density)
-        Vmp = self.voltage[idx]
-        Imp = self.current_density[idx]
-        Isc = abs(Isc)
-        FF = abs(Vmp.magnitude * Imp.magnitude / (Voc * Isc))
-        efficiency = Voc * FF * Isc
+        parameters = calculate_jv_parameters(
+            *stack_jv_curves([(self.voltage.magnitude, self.current_density.magnitude)])
+        )
+        Voc, Isc, FF, efficiency = (
+            parameters[name][0].item() for name in JV_PARAMETERS[:4]
+        )
+        if np.isnan(Voc) or np.isnan(Isc):
+            raise ValueError('The J-V curve does not cross J = 0 or V = 0.')
         return Voc, Isc, FF, efficiency
 
+    def misses_cell_params(self):
+        return (
+            self.current_density is not None
+            and self.voltage is not None
+            and self.efficiency is None
+            and not self.dark
+        )
+
+    def set_cell_params(self, parameters, idx):
+        """Sets the parameters of curve `idx` of `calculate_jv_parameters`."""
+        if np.isnan(parameters['open_circuit_voltage'][idx]):
+            return
+        self.open_circuit_voltage = parameters['open_circuit_voltage'][idx]
+        self.short_circuit_current_density = parameters[
+            'short_circuit_current_density'
+        ][idx]
+        self.fill_factor = parameters['fill_factor'][idx]
+        self.efficiency = parameters['efficiency'][idx]
+        self.potential_at_maximum_power_point = parameters[
+            'potential_at_maximum_power_point'
+        ][idx]
+        self.current_density_at_maximun_power_point = parameters[
+            'current_density_at_maximum_power_point'
+        ][idx]
+
     cell_name = Quantity(
         type=str,
         shape=[],
@@ -311,19 +470,20 @@ class SolarCellJVCurve(SolarCellJV):
 
     def normalize(self, archive, logger):
         super().normalize(archive, logger)
-        if (
-            self.current_density is not None
-            and self.efficiency is None
-            and not self.dark
-        ):
-            if self.voltage is not None:
-                (
-                    self.open_circuit_voltage,
-                    self.short_circuit_current_density,
-                    self.fill_factor,
-                    self.efficiency,
-                ) = self.cell_params()
-                self.update_results(archive)
+        if not self.misses_cell_params():
+            return
+        if isinstance(self.m_parent, JVMeasurement):
+            # the first curve calculates the parameters of all curves at once
+            self.m_parent.calculate_cell_params()
+        else:
+            (
+                self.open_circuit_voltage,
+                self.short_circuit_current_density,
+                self.fill_factor,
+                self.efficiency,
+            ) = self.cell_params()
+        if self.efficiency is not None:
+            self.update_results(archive)
 
 
 class SolarCellJVCurveCustom(SolarCellJVCurve):
@@ -450,9 +610,29 @@ class JVMeasurement(BaseMeasurement):
         label_quantity='cell_name',
     )
 
+    def calculate_cell_params(self):
+        """Calculates the missing parameters of all light curves at once."""
+        curves = [
+            curve
+            for curve in self.jv_curve
+            if curve.misses_cell_params()
+            and len(curve.voltage) == len(curve.current_density)
+        ]
+        if not curves:
+            return
+        parameters = calculate_jv_parameters(
+            *stack_jv_curves(
+                (curve.voltage.magnitude, curve.current_density.magnitude)
+                for curve in curves
+            )
+        )
+        for idx, curve in enumerate(curves):
+            curve.set_cell_params(parameters, idx)
+
     def normalize(self, archive, logger):
         self.method = 'JV Measurement'
         super().normalize(archive, logger)
+        self.calculate_cell_params()
 
         max_idx = -1
         eff = -1
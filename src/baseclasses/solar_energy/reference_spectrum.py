@@ -0,0 +1,134 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import integrate
+
+AM15G_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'AM15G.dat.txt')
+
+q = 1.602176462e-19  # % [As], elementary charge
+
+
+class ReferenceSpectrum:
+    """
+    Reference sun spectrum, loaded once per process.
+
+    The spectrum file has the photon energy in eV in the second and the
+    photon flux in cm^-2 s^-1 eV^-1 in the third column. A file with the
+    same name and the suffix `.npy` next to it, containing both columns as
+    rows, is memory-mapped instead of parsing the text file.
+
+    The interpolations onto photon energy grids are cached, the most
+    recently used `max_grids` are kept. The returned arrays are read-only.
+    """
+
+    def __init__(self, path, max_grids=64):
+        self.path = path
+        self.max_grids = max_grids
+        self._columns = None
+        self._interpolations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        npy_path = f'{os.path.splitext(self.path)[0]}.npy'
+        if os.path.exists(npy_path):
+            return np.load(npy_path, mmap_mode='r')
+
+        import pandas as pd
+
+        df = pd.read_csv(self.path, header=None)
+        columns = np.array([df[df.columns[1]], df[df.columns[2]]])
+        columns.setflags(write=False)
+        return columns
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            with self._lock:
+                if self._columns is None:
+                    self._columns = self._load()
+        return self._columns
+
+    @property
+    def energy(self):
+        """Photon energies in eV."""
+        return self.columns[0]
+
+    @property
+    def photon_flux(self):
+        """Photon flux in cm^-2 s^-1 eV^-1."""
+        return self.columns[1]
+
+    def save_npy(self):
+        """Writes the `.npy` file which is memory-mapped on the next load."""
+        np.save(f'{os.path.splitext(self.path)[0]}.npy', np.asarray(self.columns))
+
+    def interpolate(self, photon_energy):
+        """
+        Returns the photon flux on the grid `photon_energy` in eV, like
+        `np.interp(photon_energy, energy, photon_flux)`.
+        """
+        photon_energy = np.asarray(photon_energy, dtype=np.float64)
+        key = (photon_energy.shape, photon_energy.tobytes())
+        with self._lock:
+            interpolated = self._interpolations.get(key)
+            if interpolated is not None:
+                self._interpolations.move_to_end(key)
+                return interpolated
+
+        interpolated = np.interp(photon_energy, self.energy, self.photon_flux)
+        interpolated.setflags(write=False)
+        with self._lock:
+            self._interpolations[key] = interpolated
+            if len(self._interpolations) > self.max_grids:
+                self._interpolations.popitem(last=False)
+        return interpolated
+
+    def irradiance(self, energy_min=None, energy_max=None):
+        """
+        Returns the irradiance of the spectrum between the photon energies
+        in eV in W/m^2, about 1000 W/m^2 for the whole AM1.5G spectrum.
+        """
+        energy, photon_flux = self.energy, self.photon_flux
+        selected = np.ones(len(energy), dtype=bool)
+        if energy_min is not None:
+            selected &= energy >= energy_min
+        if energy_max is not None:
+            selected &= energy <= energy_max
+        power = photon_flux[selected] * energy[selected] * q
+        return integrate.trapezoid(power, energy[selected]) * 1e4
+
+
+_spectra = {}
+_spectra_lock = threading.Lock()
+
+
+def get_reference_spectrum(path=AM15G_PATH):
+    """Returns the shared `ReferenceSpectrum` of a spectrum file."""
+    with _spectra_lock:
+        if path not in _spectra:
+            _spectra[path] = ReferenceSpectrum(path)
+        return _spectra[path]
+
+
+def get_am15g_spectrum():
+    return get_reference_spectrum(AM15G_PATH)
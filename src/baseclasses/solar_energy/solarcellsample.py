@@ -15,6 +15,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import bisect
+from collections import namedtuple
+from functools import cache
+
 import numpy as np
 from nomad.datamodel.metainfo.basesections import (
     CompositeSystem,
@@ -26,9 +30,36 @@ from nomad.units import ureg
 
 from .. import ReadableIdentifiersCustom
 from ..helper.add_solar_cell import add_band_gap, add_solar_cell
+from ..helper.entry_projection import (
+    complete_projected_hits,
+    get_path,
+    iter_projected,
+)
+from ..helper.section_classes import get_section_flags
 from .module import ModuleConfiguration
 from .substrate import Substrate
 
+EntryFlags = namedtuple(
+    'EntryFlags', ['process', 'layer_deposition', 'jv_measurement', 'eqe_measurement']
+)
+
+
+@cache
+def get_entry_flags(m_def):
+    """Returns the EntryFlags of an m_def, each m_def is resolved only once."""
+    import baseclasses
+
+    from .eqemeasurement import EQEMeasurement
+    from .jvmeasurement import JVMeasurement
+
+    base_classes = (
+        baseclasses.BaseProcess,
+        baseclasses.LayerDeposition,
+        JVMeasurement,
+        EQEMeasurement,
+    )
+    return EntryFlags(*get_section_flags(m_def, base_classes))
+
 
 def collectBaseProcesses(entry, entry_id, entry_data):
     # read out information
@@ -37,15 +68,9 @@ def collectBaseProcesses(entry, entry_id, entry_data):
             {'positon_in_experimental_plan': entry_data['positon_in_experimental_plan']}
         )
     # Check if it is a layer deposition
-    import inspect
-
-    import baseclasses
-
-    entry[entry_id].update({'layer_deposition': False})
-    module = entry_data['m_def'].split('.')[0]
-    eval(f"exec('import {module}')")
-    if baseclasses.LayerDeposition in inspect.getmro(eval(entry_data['m_def'])):
-        entry[entry_id].update({'layer_deposition': True})
+    entry[entry_id].update(
+        {'layer_deposition': get_entry_flags(entry_data['m_def']).layer_deposition}
+    )
 
     if 'method' in entry_data:
         entry[entry_id].update({'method': entry_data['method']})
@@ -111,93 +136,136 @@ def collectEQEMeasurement(entry, entry_id, entry_data):
     entry[entry_id].update({'band_gap': band_gap})
 
 
+def processPosition(process):
+    if 'positon_in_experimental_plan' in process:
+        return process['positon_in_experimental_plan']
+    return -1
+
+
 def sortProcesses(processes):
-    processes_working = [p for key, p in processes.items()]
-    process_positions = [
-        p['positon_in_experimental_plan'] if 'positon_in_experimental_plan' in p else -1
-        for p in processes_working
-    ]
-    return [
-        x
-        for _, x in sorted(
-            zip(process_positions, processes_working), key=lambda pair: pair[0]
-        )
-    ]
+    return sorted(processes.values(), key=processPosition)
 
 
-def collectSampleData(archive):
-    # This function gets all archives whcih reference this archive.
-    # Iterates over them and selects relevant data for the
-    # result section of the solarcellsample
-    # At the end the synthesis steps are ordered
-    # returns a dictionary containing synthesis process, JV and EQE information
+def insertProcess(processes, process):
+    # keeps the processes sorted like sortProcesses while they are collected
+    bisect.insort(processes, process, key=processPosition)
 
-    import inspect
 
-    from nomad import files
-    from nomad.app.v1.models import MetadataPagination
-    from nomad.search import search
+def keepBestEntry(entries, entry_id, entry, score):
+    # only the entry with the highest score is kept, the first one wins ties
+    if not entries or score(entry) > score(next(iter(entries.values()))):
+        entries.clear()
+        entries[entry_id] = entry
+
+
+def bestEfficiency(jv):
+    return max((eff for eff in jv['efficiency'] if not np.isnan(eff)), default=-np.inf)
+
+
+def bestBandGap(eqe):
+    return max((gap for gap in eqe['band_gap'] if not np.isnan(gap)), default=-np.inf)
+
+
+SAMPLE_DATA_INCLUDE = [
+    'data.m_def',
+    'data.positon_in_experimental_plan',
+    'data.method',
+    'data.name',
+    'data.datetime',
+    'data.layer',
+    'data.jv_curve.efficiency',
+    'data.jv_curve.fill_factor',
+    'data.jv_curve.open_circuit_voltage',
+    'data.jv_curve.short_circuit_current_density',
+    'data.jv_curve.light_intensity',
+    'data.active_area',
+    'data.eqe_data.bandgap_eqe',
+    'data.data.bandgap_eqe',
+    'results.material.elements',
+]
 
-    import baseclasses
 
-    # search for all archives referencing this archive
+def requiredSampleData(flags):
+    # the paths the collectors read without a default, entries which miss
+    # one of them in the search index are read from their archive
+    required = []
+    if flags.process:
+        required.append('data.method')
+    if flags.jv_measurement:
+        required.append('data.jv_curve')
+    return required
+
+
+def collectSampleData(archive, page_size=100, logger=None, best_only=False):
+    # This function gets all archives whcih reference this archive.
+    # Iterates over them page by page and selects relevant data for the
+    # result section of the solarcellsample
+    # The synthesis steps are kept ordered, with best_only of the JV and EQE
+    # measurements only the one with the best efficiency and band gap are kept
+    # returns a dictionary containing synthesis process, JV and EQE information
+
+    # search for all archives referencing this archive, only the fields in
+    # SAMPLE_DATA_INCLUDE are fetched
     query = {
         'entry_references.target_entry_id': archive.metadata.entry_id,
     }
-    pagination = MetadataPagination()
-    pagination.page_size = 100
-    search_result = search(
-        owner='all',
-        query=query,
-        pagination=pagination,
-        user_id=archive.metadata.main_author.user_id,
+    if logger is None:
+        from nomad import utils
+
+        logger = utils.get_logger(__name__)
+
+    search_result = iter_projected(
+        archive,
+        query,
+        SAMPLE_DATA_INCLUDE,
+        ['data.m_def'],
+        page_size=page_size,
+        logger=logger,
     )
 
     # filter the result by synthesis processes, and JV and EQE Measurement
-    result = {'processes': {}, 'JVs': {}, 'EQEs': {}}
+    result = {'processes': [], 'JVs': {}, 'EQEs': {}}
 
-    for res in search_result.data:
+    for res in search_result:
         try:
-            # Open Archives
-            with files.UploadFiles.get(upload_id=res['upload_id']).read_archive(
-                entry_id=res['entry_id']
-            ) as arch:
-                entry_id = res['entry_id']
-                entry_data = arch[entry_id]['data']
-                entry = {entry_id: {}}
-                try:
-                    entry[entry_id]['elements'] = arch[entry_id]['results']['material'][
-                        'elements'
-                    ]
-                except BaseException:
-                    entry[entry_id]['elements'] = []
-                # Check if it is a BaseProcess
-                module = entry_data['m_def'].split('.')[0]
-                eval(f"exec('import {module}')")
-                if baseclasses.BaseProcess in inspect.getmro(eval(entry_data['m_def'])):
-                    collectBaseProcesses(entry, entry_id, entry_data)
-                    result['processes'].update(entry)
-
-                # check if it is a JV measurement
-                if (
-                    baseclasses.solar_energy.jvmeasurement.JVMeasurement
-                    in inspect.getmro(eval(entry_data['m_def']))
-                ):
-                    collectJVMeasurement(entry, entry_id, entry_data)
+            entry_id = res['entry_id']
+            flags = get_entry_flags(res['data']['m_def'])
+            complete_projected_hits(
+                [res], SAMPLE_DATA_INCLUDE, requiredSampleData(flags), logger=logger
+            )
+            entry_data = res['data']
+            entry = {entry_id: {}}
+            entry[entry_id]['elements'] = get_path(res, 'results.material.elements', [])
+            # Check if it is a BaseProcess
+            if flags.process:
+                collectBaseProcesses(entry, entry_id, entry_data)
+                insertProcess(result['processes'], entry[entry_id])
+
+            # check if it is a JV measurement
+            if flags.jv_measurement:
+                collectJVMeasurement(entry, entry_id, entry_data)
+                if best_only:
+                    keepBestEntry(
+                        result['JVs'], entry_id, entry[entry_id], bestEfficiency
+                    )
+                else:
                     result['JVs'].update(entry)
 
-                # check if EQ Measurement
-                if (
-                    baseclasses.solar_energy.eqemeasurement.EQEMeasurement
-                    in inspect.getmro(eval(entry_data['m_def']))
-                ):
-                    collectEQEMeasurement(entry, entry_id, entry_data)
+            # check if EQ Measurement
+            if flags.eqe_measurement:
+                collectEQEMeasurement(entry, entry_id, entry_data)
+                if best_only:
+                    keepBestEntry(
+                        result['EQEs'], entry_id, entry[entry_id], bestBandGap
+                    )
+                else:
                     result['EQEs'].update(entry)
         except Exception as e:
-            print('Error in processing data: ', e)
+            logger.warning(
+                f'Could not collect the data of entry {res.get("entry_id")}',
+                exc_info=e,
+            )
 
-    # sort processes by the filled previous process
-    result['processes'] = sortProcesses(result['processes'])
     return result
 
 
@@ -311,12 +379,16 @@ class SolcarCellSample(CompositeSystem):
         super().normalize(archive, logger)
 
         normalized_substrate = self.substrate
-        if normalized_substrate is not None and hasattr(normalized_substrate, 'normalize'):
+        if normalized_substrate is not None and hasattr(
+            normalized_substrate, 'normalize'
+        ):
             try:
                 normalized_substrate.normalize(archive, logger)
             except Exception:
                 if logger:
-                    logger.debug('Substrate normalize failed in SolcarCellSample.', exc_info=True)
+                    logger.debug(
+                        'Substrate normalize failed in SolcarCellSample.', exc_info=True
+                    )
 
         add_solar_cell(archive)
         archive.results.properties.optoelectronic.solar_cell.device_stack = []
@@ -354,7 +426,7 @@ class SolcarCellSample(CompositeSystem):
         # Compute module_active_area: per-cell area × number_of_pixels on substrate
         if (
             self.module_configuration
-            and self.module_configuration.is_module 
+            and self.module_configuration.is_module
             and normalized_substrate
         ):
             n_pixels = normalized_substrate.number_of_pixels
@@ -381,7 +453,8 @@ class SolcarCellSample(CompositeSystem):
                     module_active_area + module_dead_area
                 )
 
-        result_data = collectSampleData(archive)
+        # only the best JV and EQE measurement are used for the results
+        result_data = collectSampleData(archive, logger=logger, best_only=True)
 
         jv_key = ''
         jv_idx = -1
@@ -0,0 +1,124 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from baseclasses.solar_energy.eqemeasurement import (
+    EQEAnalysis,
+    calculate_bandgap,
+    calculate_j0rad,
+    calculate_jsc,
+    calculate_voc_rad,
+    fit_urbach_tail,
+)
+
+# figures of the synthetic spectra computed with the functions before EQEAnalysis
+with open(os.path.join(os.path.dirname(__file__), 'data', 'eqe_baseline.json')) as f:
+    BASELINE = json.load(f)
+
+
+def make_spectrum(seed, urbach_energy, points, descending):
+    """Synthetic eqe with an Urbach tail below a bandgap of about 1.55 eV."""
+    rng = np.random.default_rng(seed)
+    photon_energy = np.linspace(1.2, 3.0, points)
+    bandgap = 1.55 + 0.05 * rng.random()
+    above_bandgap = 0.4 + 0.4 * (1 - np.exp(-(photon_energy - bandgap) / 0.05))
+    tail = 0.4 * np.exp((photon_energy - bandgap) / urbach_energy)
+    intensity = np.where(photon_energy > bandgap, above_bandgap, tail)
+    intensity *= np.exp(rng.normal(0, 2e-3, photon_energy.size))
+    if descending:
+        return photon_energy[::-1].copy(), intensity[::-1].copy()
+    return photon_energy, intensity
+
+
+def per_quantity_figures(photon_energy, intensity):
+    """The figures as computed by the normalizer before EQEAnalysis."""
+    calculate_bandgap(photon_energy, intensity)
+    calculate_jsc(photon_energy, intensity)
+    try:
+        calculate_j0rad(photon_energy, intensity)
+        calculate_voc_rad(photon_energy, intensity)
+    except ValueError:
+        pass
+    try:
+        fit_urbach_tail(photon_energy, intensity)
+    except ValueError:
+        pass
+
+
+def shared_fit_figures(photon_energy, intensity):
+    analysis = EQEAnalysis(photon_energy, intensity)
+    analysis.bandgap
+    analysis.jsc
+    try:
+        analysis.voc_rad
+    except ValueError:
+        pass
+
+
+@pytest.mark.parametrize(
+    'case',
+    BASELINE['spectra'],
+    ids=lambda case: '-'.join(str(value) for value in case['spectrum'].values()),
+)
+def test_eqe_analysis_baseline(case):
+    photon_energy, intensity = make_spectrum(**case['spectrum'])
+    expected = case['figures']
+    analysis = EQEAnalysis(photon_energy, intensity)
+
+    np.testing.assert_allclose(analysis.bandgap, expected['bandgap'], rtol=1e-9)
+    np.testing.assert_allclose(analysis.jsc, expected['jsc'], rtol=1e-9)
+    if 'error' in expected:
+        assert expected['error'] == 'ValueError'
+        with pytest.raises(ValueError):
+            analysis.urbach_energy
+        return
+
+    np.testing.assert_allclose(
+        analysis.urbach_energy, expected['urbach_energy'], rtol=1e-9
+    )
+    np.testing.assert_allclose(
+        analysis.urbach_energy_std, expected['urbach_energy_std'], rtol=1e-9
+    )
+    if 'j0rad' not in expected:
+        with pytest.raises(ValueError):
+            analysis.j0rad
+        return
+
+    np.testing.assert_allclose(analysis.j0rad, expected['j0rad'], rtol=1e-9)
+    np.testing.assert_allclose(analysis.voc_rad, expected['voc_rad'], rtol=1e-9)
+    assert len(analysis.el) == expected['el_size']
+    np.testing.assert_allclose(
+        analysis.el[:: BASELINE['el_stride']], expected['el'], rtol=1e-9
+    )
+
+
+def test_eqe_analysis_timing():
+    spectra = [make_spectrum(**case['spectrum']) for case in BASELINE['spectra']]
+
+    start = time.perf_counter()
+    for photon_energy, intensity in spectra:
+        per_quantity_figures(photon_energy, intensity)
+    per_quantity_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for photon_energy, intensity in spectra:
+        shared_fit_figures(photon_energy, intensity)
+    shared_fit_time = time.perf_counter() - start
+
+    print(
+        f'per quantity: {per_quantity_time:.3f} s, '
+        f'EQEAnalysis: {shared_fit_time:.3f} s for {len(spectra)} spectra'
+    )
+    assert shared_fit_time < per_quantity_time
+
+
+def test_eqe_analysis_rejects_wide_urbach_tail():
+    photon_energy, intensity = make_spectrum(0, 0.03, 600, False)
+    analysis = EQEAnalysis(photon_energy, intensity)
+
+    assert analysis.urbach_energy >= 0.026
+    with pytest.raises(ValueError):
+        analysis.j0rad
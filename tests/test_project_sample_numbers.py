@@ -0,0 +1,291 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from baseclasses.helper.project_sample_numbers import (
+    SampleNumberSearch,
+    SQLiteSampleNumberStore,
+    claim_project_sample_number,
+    next_project_sample_number,
+    reserve_project_sample_number,
+)
+
+LAB_ID_BASE = 'HZB_PROJ_JoDo'
+
+
+class FakeSearch:
+    """
+    Paginated search over entries with lab ids. Sorting by the lab ids orders
+    the entries by their largest lab id, like the keyword field of the index.
+    """
+
+    def __init__(self, entries, sortable=True):
+        self.entries = entries
+        self.sortable = sortable
+        self.fetched = 0
+        self.requests = 0
+        self.hits = {}
+
+    def __call__(self, owner, query, user_id, pagination=None, required=None):
+        order_by = getattr(pagination, 'order_by', None)
+        if order_by == 'results.eln.lab_ids' and not self.sortable:
+            raise ValueError('lab ids are not sortable')
+        key = (query['results.eln.lab_ids'], query.get('entry_id'), order_by)
+        if key not in self.hits:
+            self.hits[key] = self.find(query, order_by)
+        hits = self.hits[key]
+        start = int(getattr(pagination, 'page_after_value', None) or 0)
+        stop = start + getattr(pagination, 'page_size', len(hits))
+        self.fetched += len(hits[start:stop])
+        self.requests += 1
+        return SimpleNamespace(
+            data=hits[start:stop],
+            pagination=SimpleNamespace(
+                next_page_after_value=str(stop) if stop < len(hits) else None
+            ),
+        )
+
+    def find(self, query, order_by):
+        hits = [
+            entry
+            for entry in self.entries
+            if query['results.eln.lab_ids'] in entry['results']['eln']['lab_ids']
+            and query.get('entry_id', entry['entry_id']) == entry['entry_id']
+        ]
+        if order_by == 'results.eln.lab_ids':
+            hits.sort(key=lambda entry: max(entry['results']['eln']['lab_ids']))
+            hits.reverse()
+        return hits
+
+
+def make_archive(entry_id):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(
+            entry_id=entry_id, main_author=SimpleNamespace(user_id='user')
+        )
+    )
+
+
+def make_entries(seed, count, noise=0.3):
+    """
+    Entries with lab ids as written by `export_lab_id`, the lab id and its
+    base, of this and of other bases with numbers of different lengths.
+    A share `noise` of the entries has lab ids which sort above the numbered
+    ones, an unnumbered lab id or a further one of the entry.
+    """
+    rng = random.Random(seed)
+    entries = []
+    for index in range(count):
+        base = rng.choice(
+            [
+                LAB_ID_BASE,
+                LAB_ID_BASE,
+                f'{LAB_ID_BASE}e',
+                f'{LAB_ID_BASE}_A',
+                'ZZ_other',
+            ]
+        )
+        number = rng.choice(
+            [
+                f'{rng.randint(1, 9999):04d}',
+                f'{rng.randint(1, 9999):04d}',
+                f'{rng.randint(10000, 99999)}',
+                f'{rng.randint(1, 999)}',
+            ]
+        )
+        lab_ids = [f'{base}_{number}', base]
+        if rng.random() < noise:
+            other = rng.choice(['extra', f'{base}_batch', 'ZZ_other_project'])
+            if other == 'extra':
+                lab_ids[0] = f'{base}_extra'
+            else:
+                lab_ids.append(other)
+        entries.append(
+            {'entry_id': f'entry_{index}', 'results': {'eln': {'lab_ids': lab_ids}}}
+        )
+    return entries
+
+
+def legacy_correct_lab_id(lab_id):
+    return lab_id.split('_')[-1].isdigit() and len(lab_id.split('_')[-1]) == 4
+
+
+def legacy_next_project_sample_number(data, entry_id):
+    """`cesample.get_next_project_sample_number` before the sorted search."""
+    project_sample_numbers = []
+    for entry in data:
+        lab_ids = entry['results']['eln']['lab_ids']
+        if (
+            entry['entry_id'] == entry_id
+            and lab_ids[0].split('_')[-1].isdigit()
+            and legacy_correct_lab_id(lab_ids[0])
+        ):
+            return int(lab_ids[0].split('_')[-1])
+        project_sample_numbers.extend(
+            [
+                int(lab_id.split('_')[-1])
+                for lab_id in lab_ids
+                if legacy_correct_lab_id(lab_id)
+            ]
+        )
+    return max(project_sample_numbers) + 1 if project_sample_numbers else 1
+
+
+def legacy_search(entries, entry_id):
+    """The next number of the entries found for the base, as before."""
+    data = [
+        entry for entry in entries if LAB_ID_BASE in entry['results']['eln']['lab_ids']
+    ]
+    return legacy_next_project_sample_number(data, entry_id)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('entry_id', ['new_entry', 'entry_3'])
+def test_next_project_sample_number(monkeypatch, seed, entry_id):
+    entries = make_entries(seed, count=200)
+    expected = legacy_search(entries, entry_id)
+
+    monkeypatch.setattr('nomad.search.search', FakeSearch(entries))
+    assert next_project_sample_number(make_archive(entry_id), LAB_ID_BASE) == expected
+
+    monkeypatch.setattr('nomad.search.search', FakeSearch(entries, sortable=False))
+    assert next_project_sample_number(make_archive(entry_id), LAB_ID_BASE) == expected
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_next_project_sample_number_fetches_top_entries(monkeypatch, seed):
+    entries = make_entries(seed, count=2000, noise=0.01)
+    sorted_search = FakeSearch(entries)
+    monkeypatch.setattr('nomad.search.search', sorted_search)
+    next_project_sample_number(make_archive('new_entry'), LAB_ID_BASE)
+
+    scan_search = FakeSearch(entries, sortable=False)
+    monkeypatch.setattr('nomad.search.search', scan_search)
+    next_project_sample_number(make_archive('new_entry'), LAB_ID_BASE)
+
+    assert sorted_search.fetched < scan_search.fetched
+
+
+def test_next_project_sample_number_100k_entries(monkeypatch):
+    entries = make_entries(0, count=100_000, noise=0.01)
+    expected = legacy_search(entries, 'new_entry')
+
+    sorted_search = FakeSearch(entries)
+    monkeypatch.setattr('nomad.search.search', sorted_search)
+    start = time.perf_counter()
+    number = next_project_sample_number(make_archive('new_entry'), LAB_ID_BASE)
+    sorted_time = time.perf_counter() - start
+    assert number == expected
+
+    scan_search = FakeSearch(entries, sortable=False)
+    monkeypatch.setattr('nomad.search.search', scan_search)
+    start = time.perf_counter()
+    number = next_project_sample_number(make_archive('new_entry'), LAB_ID_BASE)
+    scan_time = time.perf_counter() - start
+    assert number == expected
+
+    # the sorted search stops after the largest numbered lab id of the base
+    assert sorted_search.fetched < scan_search.fetched
+    assert sorted_search.requests <= scan_search.requests
+    print(
+        f'sorted search: {sorted_search.fetched} entries in '
+        f'{sorted_search.requests} requests, {sorted_time:.3f} s; '
+        f'scan: {scan_search.fetched} entries in '
+        f'{scan_search.requests} requests, {scan_time:.3f} s'
+    )
+
+
+def test_next_project_sample_number_without_entries(monkeypatch):
+    monkeypatch.setattr('nomad.search.search', FakeSearch([]))
+    assert next_project_sample_number(make_archive('new_entry'), LAB_ID_BASE) == 1
+
+
+def lab_id_entries(numbers):
+    return [
+        {
+            'entry_id': f'entry_{number}',
+            'results': {
+                'eln': {'lab_ids': [f'{LAB_ID_BASE}_{number:04d}', LAB_ID_BASE]}
+            },
+        }
+        for number in numbers
+    ]
+
+
+def test_sample_number_store_concurrent_reservations(monkeypatch, tmp_path):
+    monkeypatch.setattr('nomad.search.search', FakeSearch(lab_id_entries([1, 2, 5])))
+    store = SQLiteSampleNumberStore(str(tmp_path / 'numbers.sqlite'))
+
+    def reserve(index):
+        return reserve_project_sample_number(
+            make_archive(f'new_entry_{index}'), LAB_ID_BASE, store=store
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        numbers = list(executor.map(reserve, range(100)))
+
+    assert sorted(numbers) == list(range(6, 106))
+
+
+def test_sample_number_store_renormalize(monkeypatch, tmp_path):
+    monkeypatch.setattr('nomad.search.search', FakeSearch(lab_id_entries([1, 2])))
+    store = SQLiteSampleNumberStore(str(tmp_path / 'numbers.sqlite'))
+
+    first = reserve_project_sample_number(
+        make_archive('new_entry'), LAB_ID_BASE, store=store
+    )
+    other = reserve_project_sample_number(
+        make_archive('other_entry'), LAB_ID_BASE, store=store
+    )
+    again = reserve_project_sample_number(
+        make_archive('new_entry'), LAB_ID_BASE, store=store
+    )
+
+    assert (first, other, again) == (3, 4, 3)
+    assert claim_project_sample_number(
+        make_archive('new_entry'), LAB_ID_BASE, 3, store=store
+    )
+
+
+def test_sample_number_store_claim_conflicts(monkeypatch, tmp_path):
+    monkeypatch.setattr('nomad.search.search', FakeSearch(lab_id_entries([1, 2, 10])))
+    store = SQLiteSampleNumberStore(str(tmp_path / 'numbers.sqlite'))
+    reserve_project_sample_number(make_archive('new_entry'), LAB_ID_BASE, store=store)
+
+    # numbers up to the seed belong to entries created before the store
+    assert not claim_project_sample_number(
+        make_archive('new_entry'), LAB_ID_BASE, 2, store=store
+    )
+    assert claim_project_sample_number(
+        make_archive('entry_2'), LAB_ID_BASE, 2, store=store
+    )
+    assert claim_project_sample_number(
+        make_archive('new_entry'), LAB_ID_BASE, 3, store=store
+    )
+
+    # numbers after the seed are checked against the reservations
+    assert not claim_project_sample_number(
+        make_archive('other_entry'), LAB_ID_BASE, 3, store=store
+    )
+    assert claim_project_sample_number(
+        make_archive('other_entry'), LAB_ID_BASE, 20, store=store
+    )
+    assert not claim_project_sample_number(
+        make_archive('new_entry'), LAB_ID_BASE, 20, store=store
+    )
+    assert (
+        reserve_project_sample_number(
+            make_archive('third_entry'), LAB_ID_BASE, store=store
+        )
+        == 21
+    )
+
+
+def test_claim_project_sample_number_without_store(monkeypatch):
+    monkeypatch.setattr('nomad.search.search', FakeSearch(lab_id_entries([1, 2])))
+    assert not claim_project_sample_number(make_archive('new_entry'), LAB_ID_BASE, 2)
+    assert claim_project_sample_number(make_archive('entry_2'), LAB_ID_BASE, 2)
+    assert claim_project_sample_number(make_archive('new_entry'), LAB_ID_BASE, 3)
@@ -0,0 +1,63 @@
+import inspect
+
+import pytest
+
+from baseclasses.helper.section_classes import get_section_flags, resolve_section_class
+
+
+class Process:
+    pass
+
+
+class LayerDeposition(Process):
+    pass
+
+
+class SpinCoating(LayerDeposition):
+    pass
+
+
+class Measurement:
+    pass
+
+
+class JVMeasurement(Measurement):
+    pass
+
+
+BASE_CLASSES = (Process, LayerDeposition, Measurement, JVMeasurement, ValueError)
+
+M_DEFS = [
+    f'{__name__}.Process',
+    f'{__name__}.SpinCoating',
+    f'{__name__}.JVMeasurement',
+    'collections.OrderedDict',
+    'json.decoder.JSONDecodeError',
+]
+
+
+def resolve_per_call(m_def):
+    """Resolves an m_def with eval, as collectSampleData did for every entry."""
+    namespace = {}
+    exec(f'import {m_def.split(".")[0]}', namespace)
+    return eval(m_def, namespace)
+
+
+@pytest.mark.parametrize('m_def', M_DEFS)
+def test_section_flags(m_def):
+    section_class = resolve_per_call(m_def)
+    expected = tuple(
+        base_class in inspect.getmro(section_class) for base_class in BASE_CLASSES
+    )
+
+    assert resolve_section_class(m_def) is section_class
+    assert get_section_flags(m_def, BASE_CLASSES) == expected
+    assert get_section_flags(m_def, BASE_CLASSES) == expected
+
+
+@pytest.mark.parametrize(
+    'm_def', ['unknown_module.Section', f'{__name__}.Unknown', f'{__name__}.M_DEFS']
+)
+def test_section_flags_of_unknown_section(m_def):
+    assert resolve_section_class(m_def) is None
+    assert get_section_flags(m_def, BASE_CLASSES) == (False,) * len(BASE_CLASSES)
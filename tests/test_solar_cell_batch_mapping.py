@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from baseclasses.helper.solar_cell_batch_mapping import (
+    ColumnarSheet,
+    SheetPlan,
+    get_datetime,
+    get_value,
+)
+
+VALUE_ARGS = [
+    ('Volume [ml]', None),
+    ('Volume [ml]', None, True, 'ml'),
+    ('Volume [ml]', None, True, None, 1000.0),
+    ('Volume [ml]', None, False),
+    ('Count', None),
+    ('Count', None, False),
+    ('Count', None, True, 'ml'),
+    ('Name', None, False),
+    ('Name', 'default', False),
+    ('Name', None),
+    ('Number text', None),
+    ('Number text', None, False),
+    ('Date', None),
+    ('Date', None, False),
+    ('Date', None, True, 'ml'),
+    ('Day', None, False),
+    (['Missing', 'Volume [ml]'], None, True, ['ml', 'ml'], [1.0, 2.0]),
+    (['Count', 'Volume [ml]'], None, True, [None, 'ml']),
+    ('Missing', 'default', False),
+]
+
+DATETIME_KEYS = ['Date', 'Day', 'Date text', 'Missing']
+
+
+def make_sheet():
+    return pd.DataFrame(
+        {
+            'Volume [ml]': [1.5, np.nan, 0.25],
+            'Count': [3, 4, 5],
+            'Name': ['  spin coater ', None, 'glovebox'],
+            'Number text': [' 2.5 ', '7', None],
+            'Date': pd.to_datetime(['2024-01-01 00:00', None, '2024-03-05 12:30']),
+            'Day': pd.to_datetime(['2024-01-01', None, '2024-03-05']),
+            'Date text': ['01.02.2024', None, '2024-02-03 10:15:00'],
+        }
+    )
+
+
+def row_values(data):
+    values = []
+    for args in VALUE_ARGS:
+        try:
+            value = get_value(data, *args)
+        except Exception as e:
+            value = type(e)
+        values.append((type(value), value))
+    values.extend(get_datetime(data, key) for key in DATETIME_KEYS)
+    return values
+
+
+def test_row_modes_agree():
+    df = make_sheet()
+    series_rows = [row_values(row) for _, row in df.iterrows()]
+    plan_rows = [row_values(row) for _, row in SheetPlan(df.columns).iterrows(df)]
+    columnar_rows = [row_values(row) for _, row in ColumnarSheet(df).iterrows()]
+
+    assert plan_rows == series_rows
+    assert columnar_rows == series_rows
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_datetime_text(columnar):
+    df = make_sheet()
+    plan = ColumnarSheet(df) if columnar else SheetPlan(df.columns)
+    rows = [row for _, row in plan.iterrows(df)]
+
+    assert get_value(rows[0], 'Date', None, False) == '2024-01-01 00:00:00'
+    assert get_value(rows[1], 'Date', 'missing', False) == 'missing'
+    assert get_value(rows[2], 'Date', None, False) == '2024-03-05 12:30:00'
+    assert get_value(rows[2], 'Day', None, False) == '2024-03-05 00:00:00'